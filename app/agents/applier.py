@@ -15,6 +15,7 @@ from app.utils.password_generator import generate_strong_password
 from app.services.supabase_client import supabase_service
 from app.services.log_stream import log_stream_manager
 from app.services.browser_resolver import resolver
+from app.services.io_pool import run_io
 
 class ApplierAgent:
     def __init__(self, api_key: str, headless: bool = False):
@@ -81,11 +82,11 @@ class ApplierAgent:
             elif os.getenv("GITHUB_ACTIONS"):
                 mode_label = "GHA"
             
-            supabase_service.update_lead_status(lead_id, f"NAVIGATING ({mode_label})")
+            await run_io(supabase_service.update_lead_status, lead_id, f"NAVIGATING ({mode_label})")
 
         # 1. Generate a potential password for this site in case we need to register
         site_password = generate_strong_password()
-        saved_creds_str = self._get_matching_credentials(profile.get('email'))
+        saved_creds_str = await run_io(self._get_matching_credentials, profile.get('email'))
 
         # 2. Construct the Agent Task
         captcha_instruction = (
@@ -237,7 +238,7 @@ class ApplierAgent:
                     if session_id:
                          # BOLD and Highlighted as requested
                          link_msg = f"## 🔗 **Watch Live on Browser Use Cloud**: [**Click Here to View Agent**]({session_url})"
-                         supabase_service.save_chat_message(session_id, "model", link_msg)
+                         await run_io(supabase_service.save_chat_message, session_id, "model", link_msg)
                          # BROADCAST to UI immediately
                          await log_stream_manager.broadcast(str(session_id), link_msg, type="log")
             except Exception as e:
@@ -252,7 +253,7 @@ class ApplierAgent:
             """
             print(f"\\n🔐 AGENT ASKING USER: {prompt}")
             if lead_id:
-                supabase_service.request_verification(lead_id, "MANUAL_INTERACTION", prompt)
+                await run_io(supabase_service.request_verification, lead_id, "MANUAL_INTERACTION", prompt)
             
             # Polling loop
             max_retries = 60 # 5 minutes (5s * 60)
@@ -261,7 +262,7 @@ class ApplierAgent:
                 await asyncio.sleep(5)
                 
                 if lead_id:
-                    resp = supabase_service.check_verification(lead_id)
+                    resp = await run_io(supabase_service.check_verification, lead_id)
                     if resp:
                         print(f"✅ Received user input: {resp}")
                         return resp
@@ -275,11 +276,11 @@ class ApplierAgent:
             """Updates the visible status of the application for the user."""
             print(f"🔄 STATUS UPDATE: {status}")
             if lead_id:
-                supabase_service.update_lead_status(lead_id, status)
+                await run_io(supabase_service.update_lead_status, lead_id, status)
             
             if session_id:
                 # Log status update to chat (debounced? or just log all major updates)
-                supabase_service.save_chat_message(session_id, "model", f"🔄 {status}")
+                await run_io(supabase_service.save_chat_message, session_id, "model", f"🔄 {status}")
 
             return "Status updated"
 
@@ -382,11 +383,11 @@ class ApplierAgent:
                  if supabase_service:
                      print(f"✅ Marking lead as APPLIED: {resolved_url}")
                      if lead_id:
-                         supabase_service.update_lead_status(lead_id, "APPLIED")
+                         await run_io(supabase_service.update_lead_status, lead_id, "APPLIED")
                      else:
                          u_id = profile.get('user_id') or profile.get('id')
                          if u_id:
-                             supabase_service.update_lead_status_by_url(u_id, job_url, "APPLIED")
+                             await run_io(supabase_service.update_lead_status_by_url, u_id, job_url, "APPLIED")
 
             return str(status)
 
@@ -3,6 +3,7 @@ import json
 from typing import List
 from google import genai
 from app.services.supabase_client import supabase_service
+from app.services.io_pool import run_io
 
 class ChatAgent:
     def __init__(self, api_key: str):
@@ -18,7 +19,7 @@ class ChatAgent:
         Yields final action: { "type": "action", "payload": dict }
         """
         # 1. Fetch User Context (Profile, Research Status, etc.)
-        profile_data = supabase_service.get_research_status(user_id) # Returns dict of profile_data
+        profile_data = await run_io(supabase_service.get_research_status, user_id) # Returns dict of profile_data
         
         # 2. Construct System Prompt
         context_str = "User Profile Data:\n" + json.dumps(profile_data, indent=2)
@@ -9,6 +9,7 @@ from google import genai
 from browser_use import Agent, Browser
 from browser_use.llm import ChatGoogle
 from app.services.supabase_client import supabase_service
+from app.services.io_pool import run_io
 
 class GoogleResearcherAgent:
     def __init__(self, api_key: str):
@@ -87,10 +88,12 @@ class GoogleResearcherAgent:
             print(f"⚠️ Strategy Generation Error: {e}")
             return ["Software Engineer"]
 
-    async def gather_leads(self, profile: dict, limit: int = 15, job_title: str = None, location: str = None, should_stop_callback=None, log_callback=None) -> List[Dict[str, Any]]:
+    async def gather_leads(self, profile: dict, limit: int = 15, job_title: str = None, location: str = None, should_stop_callback=None, log_callback=None, source_prefix: str = None, on_lead=None) -> List[Dict[str, Any]]:
         """
         Executes Google Search queries to find direct ATS links.
         Loops through search strategies until 'limit' is reached or options exhausted.
+        If source_prefix is given, each lead's query_source is "{source_prefix}|{query}".
+        If on_lead (async) is given, it is awaited with each accepted lead as soon as its query finishes.
         """
         # 1. Get Target Titles
         if job_title:
@@ -113,6 +116,16 @@ class GoogleResearcherAgent:
         domain_chunks = [self.ats_domains[i:i + chunk_size] for i in range(0, len(self.ats_domains), chunk_size)]
 
         max_attempts = 2 # 0: Strict, 1: Broad
+
+        async def accept(query_leads: List[Dict]):
+            # Dedupe against global seen_jobs as each query completes; stream up to 'limit'
+            for lead in query_leads:
+                sig = lead.get('url', '').lower()
+                if sig and sig not in self.seen_jobs:
+                    self.seen_jobs.add(sig)
+                    all_leads.append(lead)
+                    if on_lead and len(all_leads) <= limit:
+                        await on_lead(lead)
         
         for attempt in range(max_attempts):
             # Check if we have enough leads
@@ -150,18 +163,10 @@ class GoogleResearcherAgent:
             # Reuse process_query logic (inline or helper?)
             # Refactoring process_query to method could be cleaner, but inline preserves closure context easily.
             
-            # Run the batch
-            batch_leads = await self._execute_search_batch(queries, limit - len(all_leads), should_stop_callback, log_callback)
-            
-            # Add to all_leads (deduplication happens in _execute_search_batch or here?)
-            # Let's dedupe here against global seen_jobs
-            new_count = 0
-            for lead in batch_leads:
-                sig = lead.get('url', '').lower()
-                if sig and sig not in self.seen_jobs:
-                    self.seen_jobs.add(sig)
-                    all_leads.append(lead)
-                    new_count += 1
+            # Run the batch (accept() adds each query's unique leads to all_leads)
+            before = len(all_leads)
+            await self._execute_search_batch(queries, limit - len(all_leads), should_stop_callback, log_callback, source_prefix, on_query_leads=accept)
+            new_count = len(all_leads) - before
             
             print(f"   found {new_count} new unique leads in this phase.")
             
@@ -174,7 +179,7 @@ class GoogleResearcherAgent:
 
         return all_leads[:limit]
 
-    async def _execute_search_batch(self, queries: List[str], needed: int, should_stop_callback, log_callback) -> List[Dict]:
+    async def _execute_search_batch(self, queries: List[str], needed: int, should_stop_callback, log_callback, source_prefix: str = None, on_query_leads=None) -> List[Dict]:
         """
         Helper to run a batch of queries concurrently.
         """
@@ -187,6 +192,7 @@ class GoogleResearcherAgent:
         browser_user_agent = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
 
         async def process_query(query: str):
+             query_source = f"{source_prefix}|{query}" if source_prefix else query
              async with semaphore:
                  if should_stop_callback and await should_stop_callback(): return []
                  # Fast exit if we (theoretically) filled the batch in another task? 
@@ -257,7 +263,7 @@ class GoogleResearcherAgent:
                                      url = j.get('url', '')
                                      if any(d in url for d in self.ats_domains):
                                          if await self._verify_url(url):
-                                             query_leads.append({**j, 'is_direct_listing': True, 'query_source': query})
+                                             query_leads.append({**j, 'is_direct_listing': True, 'query_source': query_source})
                              except: pass
                      finally:
                          if hasattr(browser, 'close'): await browser.close()
@@ -265,6 +271,8 @@ class GoogleResearcherAgent:
                  except Exception as e:
                      print(f"Error query {query}: {e}")
                  
+                 if on_query_leads and query_leads:
+                     await on_query_leads(query_leads)
                  return query_leads
 
         tasks = [process_query(q) for q in queries]
@@ -344,7 +352,7 @@ class GoogleResearcherAgent:
                         return False
                     return True
 
-            # CRITICAL: Wrap strict blocking IO and Sync LLM call in a thread
-            return await asyncio.to_thread(check)
+            # CRITICAL: Wrap strict blocking IO and Sync LLM call in a thread (dedicated I/O pool)
+            return await run_io(check)
         except Exception:
             return False
@@ -14,26 +14,49 @@ class MatcherAgent:
         self.client = genai.Client(api_key=api_key)
         self.model_id = "gemini-2.5-flash"
 
-    async def filter_and_score_leads(self, leads: List[Dict], profile: dict, limit: int = 10) -> List[Dict]:
+    async def filter_and_score_leads(self, leads: List[Dict], profile: dict, limit: int = 10, concurrency: int = 8) -> List[Dict]:
         """
         Takes potentially hundreds of raw leads, scores them, and returns the top matches.
+        Leads are scored concurrently, at most `concurrency` LLM calls in flight.
         """
         print(f"🧠 Matcher: Scoring {len(leads)} raw leads against profile...")
 
-        matches = []
+        sema = asyncio.Semaphore(max(1, concurrency)) # Concurrency limit (rate limits)
+
+        async def _score(lead):
+            async with sema:
+                return await self._analyze_lead(lead, profile)
+
+        async with asyncio.TaskGroup() as tg:
+            tasks = [tg.create_task(_score(lead)) for lead in leads]
+        results = [t.result() for t in tasks]
 
-        # Process in batches to avoid rate limits if needed, but for now we loop
-        # We can run these in parallel chunks if speed is needed later
-        sema = asyncio.Semaphore(5) # Concurrency limit
+        return self._rank(zip(leads, results), limit)
+
+    async def score_lead_stream(self, lead_queue: asyncio.Queue, profile: dict, limit: int = 10, concurrency: int = 8) -> List[Dict]:
+        """
+        Same as filter_and_score_leads, but scores leads as they arrive on `lead_queue`
+        (e.g. while the researcher is still searching). A None item ends the stream.
+        """
+        sema = asyncio.Semaphore(max(1, concurrency)) # Concurrency limit (rate limits)
 
         async def _score(lead):
             async with sema:
                 return await self._analyze_lead(lead, profile)
 
-        tasks = [_score(lead) for lead in leads]
-        results = await asyncio.gather(*tasks)
+        scoring = []
+        async with asyncio.TaskGroup() as tg:
+            while (lead := await lead_queue.get()) is not None:
+                scoring.append((lead, tg.create_task(_score(lead))))
+
+        print(f"🧠 Matcher: Scored {len(scoring)} streamed leads against profile...")
+        return self._rank(((lead, t.result()) for lead, t in scoring), limit)
+
+    def _rank(self, scored, limit: int) -> List[Dict]:
+        """Keeps the leads judged a match, best score first, top `limit`."""
+        matches = []
 
-        for lead, analysis in zip(leads, results):
+        for lead, analysis in scored:
             if analysis['is_match']:
                 lead['match_score'] = analysis['score']
                 lead['match_reason'] = analysis['reason']
@@ -80,7 +103,8 @@ class MatcherAgent:
             Return JSON: {{ "is_match": bool, "score": int, "reason": "str" }}
             """
 
-            response = self.client.models.generate_content(
+            # Async client so concurrent scoring doesn't block the event loop
+            response = await self.client.aio.models.generate_content(
                 model=self.model_id,
                 contents=prompt,
                 config={'response_mime_type': 'application/json'}
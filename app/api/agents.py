@@ -2,8 +2,6 @@ from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Body
 from app.api.auth import get_current_user
 from app.services.supabase_client import supabase_service
 
-from app.agents.matcher import MatcherAgent
-from app.agents.applier import ApplierAgent
 from app.services.agent_runner import run_research_pipeline, update_research_status
 import os
 import json
@@ -15,6 +13,7 @@ logger = logging.getLogger(__name__)
 
 from app.services.agent_runner import run_research_pipeline, update_research_status, run_applier_task
 from app.services.task_manager import task_manager
+from app.services.io_pool import run_io
 import asyncio
 
 # --- Routes ---
@@ -53,12 +52,12 @@ async def trigger_research(
     # Note: If GHA runs, it might not log to this session unless configured, 
     # but at least the user sees "Research: ..." in their list.
     session_title = f"Research: {resume_filename}"
-    chat_session = supabase_service.create_chat_session(user_id, session_title)
+    chat_session = await run_io(supabase_service.create_chat_session, user_id, session_title)
     session_id = chat_session['id'] if chat_session else None
 
     # Immediate feedback in Chat
     if session_id:
-        supabase_service.save_chat_message(session_id, "model", f"🕵️ Research session initialized for **{resume_filename}**. Starting agent...")
+        await run_io(supabase_service.save_chat_message, session_id, "model", f"🕵️ Research session initialized for **{resume_filename}**. Starting agent...")
 
 
 
@@ -93,19 +92,18 @@ async def get_matches(
     """
     user_id = current_user['id']
 
-    # 1. Get Status
+    # 1. Get Status + 2. Matches from DB, fetched concurrently (independent reads)
     # Use optimized fetch for just the research status (profile_data)
     # We use user_id from the token (cached) so we don't need to look up by email again
-    profile_data = supabase_service.get_research_status(user_id)
+    # Always fetch matches if there's data, regardless of status
+    profile_data, matches_data = await asyncio.gather(
+        run_io(supabase_service.get_research_status, user_id),
+        run_io(supabase_service.get_leads, user_id, resume_filename, limit=100) # Fetch more for matches view?
+    )
     status_map = profile_data.get('research_status', {})  # profile_data might be dict or None
     if not status_map: status_map = {}
     current_status = status_map.get(resume_filename, {"status": "IDLE"})
 
-    # 2. Get Matches from DB
-    matches = []
-    # Always fetch if there's data, regardless of status
-    # Always fetch if there's data, regardless of status
-    matches_data = supabase_service.get_leads(user_id, resume_filename, limit=100) # Fetch more for matches view?
     matches = matches_data.get("leads", [])
 
     # Fallback to JSON if DB empty? (Optional, maybe not needed if migration is clean slate)
@@ -113,7 +111,7 @@ async def get_matches(
         # Try legacy JSON
          try:
             target_file = f"{user_id}/matches_{resume_filename}.json"
-            content_bytes = supabase_service.download_file(target_file)
+            content_bytes = await run_io(supabase_service.download_file, target_file)
             matches = json.loads(content_bytes)
          except:
             pass
@@ -143,7 +141,7 @@ async def trigger_apply(
     api_key = os.getenv("GEMINI_API_KEY")
 
     # Get Profile Data for the applier
-    user_data = supabase_service.get_user_by_email(current_user['email'])
+    user_data = await run_io(supabase_service.get_user_by_email, current_user['email'])
     profile_blob = user_data.get('profile_data', {})
 
     # Add email/phone from top level if missing in blob
@@ -158,7 +156,7 @@ async def trigger_apply(
     profile_blob['user_id'] = user_id
     
     # IMMEDIATE STATUS UPDATE: Mark as IN_PROGRESS so UI reflects it immediately
-    supabase_service.update_lead_status_by_url(user_id, job_url, "IN_PROGRESS", resume_filename=resume_filename)
+    await run_io(supabase_service.update_lead_status_by_url, user_id, job_url, "IN_PROGRESS", resume_filename=resume_filename)
 
     # Logic Switch
     
@@ -172,11 +170,11 @@ async def trigger_apply(
 
     # Create Persistent Chat Session (Always)
     session_title = f"Apply: {job_url}"
-    chat_session = supabase_service.create_chat_session(user_id, session_title)
+    chat_session = await run_io(supabase_service.create_chat_session, user_id, session_title)
     session_id = chat_session['id'] if chat_session else None
 
     if session_id:
-        supabase_service.save_chat_message(session_id, "model", f"🚀 Application session initialized for **{job_url}**. Starting agent...")
+        await run_io(supabase_service.save_chat_message, session_id, "model", f"🚀 Application session initialized for **{job_url}**. Starting agent...")
 
 
 
@@ -196,14 +194,12 @@ async def trigger_apply(
         # 1. Download Resume
         try:
             remote_path = f"{user_id}/{resume_filename}"
-            file_bytes = supabase_service.download_file(remote_path)
-
             tmp_path = f"/tmp/apply_{user_id}_{resume_filename}"
-            with open(tmp_path, "wb") as f:
-                f.write(file_bytes)
+            # Stream to disk off the event loop (the applier needs a file path)
+            await run_io(supabase_service.download_file_to, remote_path, tmp_path)
 
             # 2. Run Applier
-            await run_applier_task(job_url, tmp_path, profile_blob, api_key, resume_filename=resume_filename, execution_mode=mode, session_id=session_id, instructions=instructions)
+            await run_applier_task(user_id, job_url, tmp_path, profile_blob, api_key, resume_filename=resume_filename, execution_mode=mode, session_id=session_id, instructions=instructions)
 
             # 3. Cleanup
             if os.path.exists(tmp_path):
@@ -212,14 +208,14 @@ async def trigger_apply(
         except asyncio.CancelledError:
              # Handle outer cancellation if wrapper is cancelled
              print(f"🛑 Wrapper: Applier Cancelled for {job_url}")
-             supabase_service.save_chat_message(session_id, "model", "🛑 Application Cancelled by user.")
+             await run_io(supabase_service.save_chat_message, session_id, "model", "🛑 Application Cancelled by user.")
 
         except Exception as e:
             print(f"❌ Apply Wrapper Failed: {e}")
             # Try to revert status if possible?
-            supabase_service.update_lead_status_by_url(user_id, job_url, "FAILED")
+            await run_io(supabase_service.update_lead_status_by_url, user_id, job_url, "FAILED")
             if session_id:
-                supabase_service.save_chat_message(session_id, "model", f"❌ Application Failed: {e}")
+                await run_io(supabase_service.save_chat_message, session_id, "model", f"❌ Application Failed: {e}")
 
     # Launch task
     task = asyncio.create_task(_download_and_apply())
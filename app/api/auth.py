@@ -7,6 +7,7 @@ from jose import JWTError, jwt
 import bcrypt  # Changed from passlib
 from pydantic import BaseModel
 from app.services.supabase_client import supabase_service
+from app.services.io_pool import run_io
 
 # Configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "super-secret-key-please-change")
@@ -87,7 +88,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
             return cached_user
 
     # Verify user still exists
-    user = supabase_service.get_user_by_email(email)
+    user = await run_io(supabase_service.get_user_by_email, email)
     if user is None:
         raise credentials_exception
     
@@ -99,20 +100,19 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
 # Routes
 @router.post("/register", response_model=UserResponse)
 async def register(user: UserCreate):
-    existing_user = supabase_service.get_user_by_email(user.email)
-    if existing_user:
-        raise HTTPException(status_code=400, detail="Email already registered")
-
     hashed_pw = get_password_hash(user.password)
     try:
-        new_user = supabase_service.create_user(user.email, hashed_pw, user.full_name)
-        return new_user
+        # Duplicate emails are rejected by the insert itself (no separate lookup round trip)
+        new_user = await run_io(supabase_service.create_user, user.email, hashed_pw, user.full_name)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if not new_user:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    return new_user
 
 @router.post("/token", response_model=Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = supabase_service.get_user_by_email(form_data.username)
+    user = await run_io(supabase_service.get_user_by_email, form_data.username)
     if not user or not verify_password(form_data.password, user['password_hash']):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
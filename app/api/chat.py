@@ -4,6 +4,7 @@ from app.api.auth import get_current_user
 from app.agents.chat_agent import ChatAgent
 from app.services.supabase_client import supabase_service
 from app.services.log_stream import log_stream_manager
+from app.services.io_pool import run_io
 import os
 import json
 import asyncio
@@ -24,14 +25,14 @@ class MessageRequest(BaseModel):
 
 @router.get("/sessions")
 async def get_sessions(current_user: dict = Depends(get_current_user)):
-    return supabase_service.get_chat_sessions(current_user['id'])
+    return await run_io(supabase_service.get_chat_sessions, current_user['id'])
 
 @router.post("/sessions")
 async def create_session(
     payload: CreateSessionRequest,
     current_user: dict = Depends(get_current_user)
 ):
-    session = supabase_service.create_chat_session(current_user['id'], payload.title)
+    session = await run_io(supabase_service.create_chat_session, current_user['id'], payload.title)
     if not session:
         raise HTTPException(status_code=500, detail="Failed to create session")
     return session
@@ -42,7 +43,7 @@ async def update_session(
     payload: UpdateSessionRequest,
     current_user: dict = Depends(get_current_user)
 ):
-    session = supabase_service.update_chat_session_title(session_id, payload.title)
+    session = await run_io(supabase_service.update_chat_session_title, session_id, payload.title)
     if not session:
         raise HTTPException(status_code=500, detail="Failed to update session")
     return session
@@ -52,7 +53,7 @@ async def delete_session(
     session_id: int,
     current_user: dict = Depends(get_current_user)
 ):
-    success = supabase_service.delete_chat_session(session_id)
+    success = await run_io(supabase_service.delete_chat_session, session_id)
     if not success:
         raise HTTPException(status_code=500, detail="Failed to delete session")
     return {"status": "success"}
@@ -62,7 +63,7 @@ async def get_session_messages(
     session_id: str,
     current_user: dict = Depends(get_current_user)
 ):
-    return supabase_service.get_chat_history(session_id)
+    return await run_io(supabase_service.get_chat_history, session_id)
 
 async def handle_agent_action(action, user_id, session_id, available_resumes, current_user, api_key):
     """
@@ -86,7 +87,7 @@ async def handle_agent_action(action, user_id, session_id, available_resumes, cu
             from app.services.agent_runner import run_research_pipeline, update_research_status
             
             # Idempotency Check
-            current_status = supabase_service.get_research_status(user_id).get(resume_filename, {}).get("status")
+            current_status = (await run_io(supabase_service.get_research_status, user_id)).get(resume_filename, {}).get("status")
             if current_status in ["SEARCHING", "QUEUED"]:
                 msg = f"\n\n(⚠️ Research for **{resume_filename}** is already in progress. Please wait or cancel the current task.)"
                 return msg
@@ -113,7 +114,7 @@ async def handle_agent_action(action, user_id, session_id, available_resumes, cu
             
             # 1. Fallback: Lookup by Title
             if not job_url and job_title:
-                lead = supabase_service.get_lead_by_title(user_id, job_title)
+                lead = await run_io(supabase_service.get_lead_by_title, user_id, job_title)
                 if lead:
                     job_url = lead['url']
                     extra_response = f"\n\n✅ Found job match: **{lead['title']}** at **{lead['company']}**"
@@ -126,7 +127,7 @@ async def handle_agent_action(action, user_id, session_id, available_resumes, cu
 
             # 2. Resume Fallback
             if not resume_filename:
-                user_row = supabase_service.get_user_by_email(current_user['email'])
+                user_row = await run_io(supabase_service.get_user_by_email, current_user['email'])
                 profile_data = user_row.get('profile_data', {})
                 resume_filename = profile_data.get('primary_resume_name')
                 if resume_filename:
@@ -148,7 +149,7 @@ async def handle_agent_action(action, user_id, session_id, available_resumes, cu
 
             from app.services.agent_runner import run_applier_task
             
-            user_data = supabase_service.get_user_by_email(current_user['email'])
+            user_data = await run_io(supabase_service.get_user_by_email, current_user['email'])
             profile_blob = user_data.get('profile_data', {})
             if 'email' not in profile_blob: profile_blob['email'] = current_user['email']
             if 'full_name' not in profile_blob and user_data.get('full_name'): profile_blob['full_name'] = user_data.get('full_name')
@@ -157,25 +158,23 @@ async def handle_agent_action(action, user_id, session_id, available_resumes, cu
             if extra_instructions:
                 profile_blob['apply_instructions'] = extra_instructions
             
-            supabase_service.update_lead_status_by_url(user_id, job_url, "IN_PROGRESS", resume_filename=resume_filename)
+            await run_io(supabase_service.update_lead_status_by_url, user_id, job_url, "IN_PROGRESS", resume_filename=resume_filename)
 
             async def _run_apply():
                 try:
                     remote_path = f"{user_id}/{resume_filename}"
-                    file_bytes = supabase_service.download_file(remote_path)
-                    
                     tmp_path = f"/tmp/apply_{user_id}_{resume_filename}"
-                    with open(tmp_path, "wb") as f:
-                        f.write(file_bytes)
+                    # Stream to disk off the event loop (the applier needs a file path)
+                    await run_io(supabase_service.download_file_to, remote_path, tmp_path)
                     
-                    await run_applier_task(job_url, tmp_path, profile_blob, api_key, resume_filename=resume_filename, execution_mode=execution_mode, session_id=session_id)
+                    await run_applier_task(user_id, job_url, tmp_path, profile_blob, api_key, resume_filename=resume_filename, execution_mode=execution_mode, session_id=session_id)
                     
                     if os.path.exists(tmp_path):
                         os.remove(tmp_path)
                 except Exception as e:
                     print(f"❌ Apply via Chat Failed: {e}")
-                    supabase_service.update_lead_status_by_url(user_id, job_url, "FAILED")
-                    supabase_service.save_chat_message(session_id, "model", f"❌ Application Failed: {e}")
+                    await run_io(supabase_service.update_lead_status_by_url, user_id, job_url, "FAILED")
+                    await run_io(supabase_service.save_chat_message, session_id, "model", f"❌ Application Failed: {e}")
 
             asyncio.create_task(_run_apply())
 
@@ -202,19 +201,21 @@ async def chat_message(
     # 1. If no session, create one
     if not session_id:
         title = (payload.message[:30] + "...") if len(payload.message) > 30 else payload.message
-        session = supabase_service.create_chat_session(user_id, title)
+        session = await run_io(supabase_service.create_chat_session, user_id, title)
         if session:
             session_id = session['id']
         else:
              raise HTTPException(status_code=500, detail="Failed to init session")
 
     # 2. Save User Message
-    supabase_service.save_chat_message(session_id, "user", payload.message)
+    await run_io(supabase_service.save_chat_message, session_id, "user", payload.message)
 
     # 3. Fetch Context
-    resumes_list = supabase_service.list_resumes(user_id)
+    resumes_list, db_history = await asyncio.gather(
+        run_io(supabase_service.list_resumes, user_id),
+        run_io(supabase_service.get_chat_history, session_id)
+    )
     available_resumes = [r['name'] for r in resumes_list]
-    db_history = supabase_service.get_chat_history(session_id)
     history = [{"role": msg['role'], "content": msg['content']} for msg in db_history if msg['content'] != payload.message]
 
     # Initialize Agent
@@ -255,7 +256,7 @@ async def chat_message(
                 yield json.dumps({"type": "token", "content": error_msg}) + "\n"
 
         # 6. Save Final Bot Message
-        supabase_service.save_chat_message(session_id, "model", full_response)
+        await run_io(supabase_service.save_chat_message, session_id, "model", full_response)
         
         # Yield Done (Validation and handling done)
         yield json.dumps({
@@ -285,7 +286,7 @@ async def cancel_research(
     resume_filename = payload.get("resume_filename")
     if not resume_filename:
         # Try primary resume
-        profile = supabase_service.get_user_profile(current_user['id'])
+        profile = await run_io(supabase_service.get_user_profile, current_user['id'])
         resume_filename = profile.get("primary_resume_name")
         
     if not resume_filename:
@@ -297,6 +298,6 @@ async def cancel_research(
     # Also notify session if provided
     session_id = payload.get("session_id")
     if session_id:
-        supabase_service.save_chat_message(session_id, "model", "🛑 Cancellation requested... Stopping agents.")
+        await run_io(supabase_service.save_chat_message, session_id, "model", "🛑 Cancellation requested... Stopping agents.")
         
     return {"status": "cancelled", "resume": resume_filename}
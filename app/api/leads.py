@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from app.services.supabase_client import supabase_service
+from app.services.io_pool import run_io
 from app.api.auth import get_current_user
 from typing import List, Optional
+import orjson
 
 router = APIRouter()
 
@@ -10,31 +12,37 @@ async def get_leads(
     resume: Optional[str] = Query(None, description="Filter by resume filename"),
     page: int = 1,
     limit: int = 10,
+    after_score: Optional[int] = Query(None, description="Keyset cursor: match_score of the last lead seen"),
+    after_id: Optional[int] = Query(None, description="Keyset cursor: id of the last lead seen"),
     current_user: dict = Depends(get_current_user)
 ):
     """
     Fetch job leads for the current user. 
     Optionally filter by resume context.
+    Pass after_id (and after_score, omitted for unscored leads) from "next_after" to page by cursor.
     """
     user_id = current_user['id']
     
     if not resume:
         # Try to get primary resume
-        user_data = supabase_service.get_user_by_email(current_user['email'])
+        user_data = await run_io(supabase_service.get_user_by_email, current_user['email'])
         if user_data and user_data.get('primary_resume_name'):
             resume = user_data['primary_resume_name']
         else:
             return {"leads": [], "total": 0, "resume_context": None, "message": "No resume context found."}
 
-    result = supabase_service.get_leads(user_id, resume, page=page, limit=limit)
+    after = (after_score, after_id) if after_id is not None else None
+    result, leads_json = await run_io(supabase_service.get_leads_json, user_id, resume, page=page, limit=limit, after=after)
     
-    return {
-        "leads": result["leads"],
+    meta = orjson.dumps({
         "total": result["total"],
+        "next_after": result.get("next_after"),
         "page": page,
         "limit": limit,
         "resume_context": resume
-    }
+    })
+    # Splice in the cached leads bytes instead of re-encoding the list on every request
+    return Response(content=b'{"leads":' + leads_json + b"," + meta[1:], media_type="application/json")
 
 @router.delete("/{lead_id}")
 async def delete_lead(lead_id: int, current_user: dict = Depends(get_current_user)):
@@ -42,7 +50,7 @@ async def delete_lead(lead_id: int, current_user: dict = Depends(get_current_use
     Delete a job lead.
     """
     user_id = current_user['id']
-    success = supabase_service.delete_lead(lead_id, user_id)
+    success = await run_io(supabase_service.delete_lead, lead_id, user_id)
     if not success:
          raise HTTPException(status_code=500, detail="Failed to delete lead")
     return {"status": "success", "message": f"Lead {lead_id} deleted."}
@@ -53,5 +61,5 @@ async def get_lead_counts(current_user: dict = Depends(get_current_user)):
     Get counts of leads grouped by resume.
     """
     user_id = current_user['id']
-    counts = supabase_service.get_lead_counts(user_id)
+    counts = await run_io(supabase_service.get_lead_counts, user_id)
     return counts
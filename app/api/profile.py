@@ -1,10 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, Body
 from app.api.auth import get_current_user
 from app.services.supabase_client import supabase_service
-from app.utils.resume_parser import ResumeParser
+from app.services.io_pool import run_io
+from app.utils.resume_parser import ResumeParser, JSON_FENCE_RE
 import os
-import json
-import tempfile
+import orjson
 from datetime import datetime
 
 
@@ -54,7 +54,7 @@ async def get_profile(current_user: dict = Depends(get_current_user)):
     Get current user profile (merging Auth data and Profile data).
     """
     # 1. Fetch Profile Data
-    profile = supabase_service.get_user_profile(current_user['id'])
+    profile = await run_io(supabase_service.get_user_profile, current_user['id'])
     
     # 2. Merge with Current User (Email, ID)
     if profile:
@@ -88,7 +88,7 @@ async def update_profile(
         raise HTTPException(status_code=400, detail="No valid fields to update")
 
     # Update Profiles Table
-    updated_profile = supabase_service.update_user_profile(user_id, clean_data)
+    updated_profile = await run_io(supabase_service.update_user_profile, user_id, clean_data)
     if not updated_profile:
         raise HTTPException(status_code=500, detail="Failed to update profile")
 
@@ -122,32 +122,19 @@ async def parse_resume(
         # Supabase download checks path.
 
         # 1. Download file content
-        file_bytes = supabase_service.download_file(resume_path)
+        file_bytes = await run_io(supabase_service.download_file, resume_path)
 
-        # 2. Save temporarily for the parser
-        # Use user_id prefix to avoid collision in /tmp
-        safe_name = os.path.basename(resume_path)
-        tmp_path = f"/tmp/{user_id}_{safe_name}"
-
-        with open(tmp_path, "wb") as f:
-            f.write(file_bytes)
-
-        # 3. Parse
-        json_str = await parser.parse_to_json(tmp_path)
-
-        # 4. Clean up
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
+        # 2. Parse (in memory, no temp file)
+        json_str = await parser.parse_bytes(file_bytes)
 
         # 5. Parse JSON string to Object
         try:
-             parsed_data = json.loads(json_str)
-        except json.JSONDecodeError:
+             parsed_data = orjson.loads(json_str)
+        except orjson.JSONDecodeError:
              # Fallback if LLM returned markdown block
-             import re
-             match = re.search(r'```json\n(.*?)\n```', json_str, re.DOTALL)
+             match = JSON_FENCE_RE.search(json_str)
              if match:
-                 parsed_data = json.loads(match.group(1))
+                 parsed_data = orjson.loads(match.group(1))
              else:
                  parsed_data = {"raw_text": json_str}
 
@@ -156,7 +143,7 @@ async def parse_resume(
 
         # 6. Auto-Save to Profile (Merge with existing)
         # Fetch existing to preserve voluntary questions (race, veteran, etc.) which aren't in resume
-        existing_profile = supabase_service.get_user_profile(user_id)
+        existing_profile = await run_io(supabase_service.get_user_profile, user_id)
         existing_data = existing_profile.get("profile_data", {}) if existing_profile else {}
 
         # Merge: parsed data overwrites conflicting keys, but keeps unique existing keys
@@ -167,7 +154,7 @@ async def parse_resume(
         if "full_name" in parsed_data and parsed_data["full_name"]:
             update_payload["full_name"] = parsed_data["full_name"]
 
-        supabase_service.update_user_profile(user_id, update_payload)
+        await run_io(supabase_service.update_user_profile, user_id, update_payload)
 
         return update_payload
 
@@ -198,21 +185,10 @@ async def generate_resume_summary(
 
     try:
         # Download from Supabase
-        file_bytes = supabase_service.download_file(resume_path)
-
-        # Save to temp
-        safe_name = os.path.basename(resume_path)
-        tmp_path = os.path.join(tempfile.gettempdir(), f"{user_id}_{safe_name}")
-
-        with open(tmp_path, "wb") as f:
-            f.write(file_bytes)
+        file_bytes = await run_io(supabase_service.download_file, resume_path)
 
         parser = ResumeParser(os.getenv("GEMINI_API_KEY"))
-        summary = await parser.generate_summary(tmp_path)
-
-        # Clean up
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
+        summary = await parser.summarize_bytes(file_bytes)
 
         return {"summary": summary.strip()}
 
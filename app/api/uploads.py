@@ -1,11 +1,12 @@
 from typing import List, Dict, Any
 from fastapi import APIRouter, File, UploadFile, HTTPException, Depends
 from app.services.supabase_client import supabase_service
+from app.services.io_pool import run_io
 from app.api.auth import get_current_user
-from app.utils.resume_parser import ResumeParser
+from app.utils.resume_parser import ResumeParser, JSON_FENCE_RE
 import os
-import json
-import tempfile
+import orjson
+import asyncio
 
 router = APIRouter()
 
@@ -40,7 +41,8 @@ async def upload_resume(
         safe_name = os.path.basename(file.filename)
 
         # 1. Upload to Storage
-        public_url = supabase_service.upload_resume(
+        public_url = await run_io(
+            supabase_service.upload_resume,
             file_content=content,
             file_name=safe_name,
             user_id=user_id,
@@ -52,26 +54,16 @@ async def upload_resume(
         # 2. Trigger Parsing (if parser available)
         if parser:
             try:
-                # Save temp for Gemini
-                tmp_path = os.path.join(tempfile.gettempdir(), f"{user_id}_{safe_name}")
-                with open(tmp_path, "wb") as f:
-                    f.write(content)
-                
-                # Parse
+                # Parse straight from the uploaded bytes
                 print(f"🔮 Parsing resume: {safe_name}...")
-                json_str = await parser.parse_to_json(tmp_path)
-                
-                # Cleanup temp
-                if os.path.exists(tmp_path):
-                    os.remove(tmp_path)
+                json_str = await parser.parse_bytes(content)
 
                 # Decode & Transform
                 try:
-                    parsed_data = json.loads(json_str)
-                except json.JSONDecodeError:
-                    import re
-                    match = re.search(r'```json\n(.*?)\n```', json_str, re.DOTALL)
-                    parsed_data = json.loads(match.group(1)) if match else {}
+                    parsed_data = orjson.loads(json_str)
+                except orjson.JSONDecodeError:
+                    match = JSON_FENCE_RE.search(json_str)
+                    parsed_data = orjson.loads(match.group(1)) if match else {}
 
                 if parsed_data:
                     profile_data = parser.map_to_schema(parsed_data)
@@ -88,7 +80,7 @@ async def upload_resume(
                 # We continue to at least save the file association
 
         # 3. Update User Profile (Primary Resume & Data)
-        user_data = supabase_service.get_user_by_email(current_user['email'])
+        user_data = await run_io(supabase_service.get_user_by_email, current_user['email'])
         if user_data:
             current_profile_data = user_data.get('profile_data') or {}
             
@@ -123,7 +115,7 @@ async def upload_resume(
                 print(f"✅ Auto-set primary resume to: {safe_name}")
 
             if updates:
-                supabase_service.update_user_profile(user_id, updates)
+                await run_io(supabase_service.update_user_profile, user_id, updates)
 
         return {
             "message": "Upload successful",
@@ -143,12 +135,14 @@ async def list_resumes(
     """
     try:
         user_id = current_user['id']
-        files = supabase_service.list_resumes(user_id=user_id)
+        # Storage listing and lead counts are independent; fetch them concurrently
+        files, counts = await asyncio.gather(
+            run_io(supabase_service.list_resumes, user_id=user_id),
+            run_io(supabase_service.get_lead_counts, user_id)
+        )
         # Filter out non-allowed extensions (e.g. .json matches files)
         files = [f for f in files if any(f['name'].lower().endswith(ext) for ext in ALLOWED_EXTENSIONS)]
 
-        # Fetch lead counts
-        counts = supabase_service.get_lead_counts(user_id)
         for f in files:
             f['job_count'] = counts.get(f['name'], 0)
 
@@ -171,7 +165,7 @@ async def delete_resume(
 
     try:
         # Check if it was the primary resume & cleanup status
-        user = supabase_service.get_user_by_email(current_user['email'])
+        user = await run_io(supabase_service.get_user_by_email, current_user['email'])
         updates = {}
 
         if user:
@@ -186,12 +180,12 @@ async def delete_resume(
                 updates["profile_data"] = profile_data
 
             if updates:
-                 supabase_service.update_user_profile(user_id, updates)
+                 await run_io(supabase_service.update_user_profile, user_id, updates)
 
         # Invalidate leads cache for the deleted resume
         supabase_service.invalidate_leads_cache(user_id, filename)
 
-        supabase_service.delete_file(path)
+        await run_io(supabase_service.delete_file, path)
         return {"message": "Deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -5,14 +5,20 @@ import os
 import sys
 import logging
 
+# Optional faster event loop (libuv); not available on Windows
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
 # Ensure app can be imported
 sys.path.append(os.getcwd())
 
-from app.services.agent_runner import run_research_pipeline, run_applier_task
-from app.services.supabase_client import supabase_service
+from app.services.agent_runner import run_research_pipeline
+from app.services.apply_runner import prepare_and_run_apply
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger("cli")
 
 async def main():
@@ -40,8 +46,6 @@ async def main():
             limit = payload.get("limit", 20)
             job_title = payload.get("job_title")
             location = payload.get("location")
-            job_title = payload.get("job_title")
-            location = payload.get("location")
             session_id = payload.get("session_id")
 
             if not user_id or not resume_filename:
@@ -52,44 +56,12 @@ async def main():
             await run_research_pipeline(user_id, resume_filename, api_key, limit, job_title, location, session_id=session_id)
 
         elif args.task == "apply":
-            user_id = payload.get("user_id") # Needed for resume path construction if redundant
-            job_url = payload.get("job_url")
-            # In API we downloaded resume to tmp.
-            # Here we should probably do the same logic or let run_applier_task handle it?
-            # run_applier_task (in agent_runner) accepts a LOCAL resume_path.
-            # So we must download it here first.
-
-            resume_filename = payload.get("resume_filename")
-            user_profile = payload.get("user_profile", {}) # Expecting profile blob or email/name
-            user_profile["user_id"] = user_id # Ensure ID is passed for lead lookup
-
-
-            if not user_id or not job_url or not resume_filename:
+            if not payload.get("user_id") or not payload.get("job_url") or not payload.get("resume_filename"):
                  logger.error("Missing user_id, job_url, or resume_filename")
                  sys.exit(1)
 
-            # Download Resume Logic
-            # (Duplicated from API logic, but safer here)
-            logger.info(f"Downloading resume for Application: {resume_filename}")
-
             try:
-                remote_path = f"{user_id}/{resume_filename}"
-                file_bytes = supabase_service.download_file(remote_path)
-
-                import uuid
-                tmp_id = str(uuid.uuid4())
-                tmp_path = f"/tmp/{tmp_id}_{resume_filename}"
-
-                with open(tmp_path, "wb") as f:
-                    f.write(file_bytes)
-
-                logger.info(f"Starting Apply Task: URL={job_url}")
-                await run_applier_task(job_url, tmp_path, user_profile, api_key, resume_filename=resume_filename)
-
-                # Cleanup
-                if os.path.exists(tmp_path):
-                    os.remove(tmp_path)
-
+                await prepare_and_run_apply(payload, api_key)
             except Exception as e:
                 logger.error(f"Failed to prepare application context: {e}")
                 sys.exit(1)
@@ -113,4 +85,7 @@ async def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if uvloop:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
@@ -1,72 +1,198 @@
 
 import os
-import json
+import re
+import orjson
 import logging
 import asyncio
+import httpx
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
 from app.services.supabase_client import supabase_service
 from app.services.log_stream import log_stream_manager
+from app.services.io_pool import run_io
+from app.services import cancel_watcher
+from app.services.cancel_watcher import CancellationWatcher
+from postgrest.exceptions import APIError
 import traceback
 
-from app.agents.google_researcher import GoogleResearcherAgent
-from app.agents.matcher import MatcherAgent
-from app.agents.applier import ApplierAgent
-
 logger = logging.getLogger(__name__)
 
+# Fallback for LLM output wrapped in a ```json fence
+_JSON_FENCE_RE = re.compile(r"```json\n(.*?)\n```", re.DOTALL)
+
+# Deployment config, read once at import (load_dotenv already ran in supabase_client)
+CLOUD_RUN_URL = os.getenv("CLOUD_RUN_URL")
+IS_CLOUD_WORKER = os.getenv("IS_CLOUD_WORKER")
+WORKER_SECRET = os.getenv("WORKER_SECRET", "")
+HEADLESS = os.getenv("HEADLESS", "false").lower() == "true"
+
+# Shared client for Cloud Worker dispatch (keep-alive/HTTP2 across dispatches); closed in main.py lifespan.
+# The worker secret header and task URL never change, so they are built once here.
+WORKER_TASK_URL = f"{CLOUD_RUN_URL}/api/worker/task" if CLOUD_RUN_URL else None
+_dispatch_http = httpx.AsyncClient(http2=True, timeout=300.0, headers={"x-worker-secret": WORKER_SECRET})
+
+async def aclose():
+    # Let queued status writes land so the UI isn't left showing an active state
+    if _status_tasks:
+        await asyncio.gather(*_status_tasks, return_exceptions=True)
+    await _dispatch_http.aclose()
+    await cancel_watcher.aclose()
+
+# Each local apply drives its own Chromium; cap how many run at once in this process
+MAX_PARALLEL_APPLIES = int(os.getenv("MAX_PARALLEL_APPLIES", "3"))
+_apply_sem = asyncio.Semaphore(MAX_PARALLEL_APPLIES)
+
+# Local research runs (LLM + Google + Supabase) admitted at once; the rest queue
+MAX_PARALLEL_RESEARCH = int(os.getenv("MAX_PARALLEL_RESEARCH", "4"))
+_research_sem = asyncio.Semaphore(MAX_PARALLEL_RESEARCH)
+
+# Flipped off if the update_research_status / get_research_status RPCs aren't deployed (see supabase/migrations)
+_status_rpc_available = True
+_status_read_rpc_available = True
+
+# Per-user profile_data as of our last write: {user_id: (profile_data, timestamp)}
+# Short TTL so changes made elsewhere (e.g. a user's cancel request) are picked up quickly.
+_profile_cache = {}
+PROFILE_CACHE_TTL = 5 # seconds
+_profile_locks = {}
+_profile_locks_guard = threading.Lock()
+
+# Last status write per resume: {(user_id, resume_filename): (status, last_log, timestamp)}
+# An identical write inside the window is a no-op, so it is skipped.
+_last_status_written = {}
+STATUS_RESEND_TTL = 5 # seconds
+
+def _profile_lock(user_id: int) -> threading.Lock:
+    with _profile_locks_guard:
+        return _profile_locks.setdefault(user_id, threading.Lock())
+
+def _update_research_status_legacy(user_id: int, resume_filename: str, status: str, last_log: str = None):
+    """Read-modify-write of profile_data, used until the RPC migration is applied."""
+    with _profile_lock(user_id):
+        try:
+            _write_research_status(user_id, resume_filename, status, last_log)
+        except Exception:
+            _profile_cache.pop(user_id, None)
+            raise
+
+def _write_research_status(user_id: int, resume_filename: str, status: str, last_log: str = None):
+    cached = _profile_cache.get(user_id)
+    if cached and time.time() - cached[1] < PROFILE_CACHE_TTL:
+        current_data = cached[0]
+    else:
+        response = supabase_service.client.table("profiles").select("profile_data").eq("user_id", user_id).execute()
+        if not response.data:
+            return
+        current_data = response.data[0].get("profile_data") or {}
+
+    if "research_status" not in current_data:
+        current_data["research_status"] = {}
+
+    # RACE CONDITION FIX: Do not overwrite a FINAL state (COMPLETED/FAILED/CANCELLED) with an active state (SEARCHING)
+    # This happens if a delayed log broadcast finishes AFTER the main thread has set completion.
+    current_status_entry = current_data["research_status"].get(resume_filename, {})
+    current_status_val = current_status_entry.get("status", "IDLE")
+
+    final_states = ["COMPLETED", "FAILED", "CANCELLED", "CANCEL_REQUESTED"]
+    if current_status_val in final_states and status not in final_states:
+         # Just update the log, NOT the status
+         current_data["research_status"][resume_filename]["last_log"] = last_log or current_status_entry.get("last_log")
+         # Keep existing status
+         current_data["research_status"][resume_filename]["updated_at"] = datetime.now(timezone.utc).isoformat()
+    else:
+        # Normal Update
+        current_data["research_status"][resume_filename] = {
+            "status": status,
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }
+        if last_log:
+            current_data["research_status"][resume_filename]["last_log"] = last_log
+
+    supabase_service.update_user_profile(user_id, {"profile_data": current_data})
+    _profile_cache[user_id] = (current_data, time.time())
+
 def update_research_status(user_id: int, resume_filename: str, status: str, last_log: str = None):
     """
     Updates the 'research_status' in the user's profile_data.
     States: IDLE, QUEUED, SEARCHING, COMPLETED, FAILED
     """
+    global _status_rpc_available
+
+    key = (user_id, resume_filename)
+    last = _last_status_written.get(key)
+    if last and last[0] == status and last[1] == last_log and time.time() - last[2] < STATUS_RESEND_TTL:
+        return
+
     # Retry loop for resilience against "Server disconnected"
     for attempt in range(3):
         try:
-            response = supabase_service.client.table("profiles").select("profile_data").eq("user_id", user_id).execute()
-            if not response.data:
-                return
-
-            current_data = response.data[0].get("profile_data") or {}
-            if "research_status" not in current_data:
-                current_data["research_status"] = {}
-
-            # RACE CONDITION FIX: Do not overwrite a FINAL state (COMPLETED/FAILED/CANCELLED) with an active state (SEARCHING)
-            # This happens if a delayed log broadcast finishes AFTER the main thread has set completion.
-            current_status_entry = current_data["research_status"].get(resume_filename, {})
-            current_status_val = current_status_entry.get("status", "IDLE")
-
-            final_states = ["COMPLETED", "FAILED", "CANCELLED", "CANCEL_REQUESTED"]
-            if current_status_val in final_states and status not in final_states:
-                 # Just update the log, NOT the status
-                 current_data["research_status"][resume_filename]["last_log"] = last_log or current_status_entry.get("last_log")
-                 # Keep existing status
-                 current_data["research_status"][resume_filename]["updated_at"] = str(os.times())
-            else:
-                # Normal Update
-                current_data["research_status"][resume_filename] = {
-                    "status": status,
-                    "updated_at": str(os.times())
-                }
-                if last_log:
-                    current_data["research_status"][resume_filename]["last_log"] = last_log
-
-            supabase_service.update_user_profile(user_id, {"profile_data": current_data})
+            if _status_rpc_available:
+                try:
+                    # One atomic round trip; the final-state guard lives in the SQL function
+                    supabase_service.client.rpc("update_research_status", {
+                        "p_user_id": user_id,
+                        "p_resume": resume_filename,
+                        "p_status": status,
+                        "p_last_log": last_log
+                    }).execute()
+                    supabase_service.clear_user_cache(user_id)
+                    _last_status_written[key] = (status, last_log, time.time())
+                    return # Success
+                except APIError as e:
+                    if e.code != "PGRST202":
+                        raise
+                    print("⚠️ update_research_status RPC not found, falling back to read-modify-write")
+                    _status_rpc_available = False
+
+            _update_research_status_legacy(user_id, resume_filename, status, last_log)
+            _last_status_written[key] = (status, last_log, time.time())
             return # Success
 
         except Exception as e:
             if attempt < 2:
                 print(f"⚠️ Failed to update research status (Attempt {attempt+1}/3): {e}. Retrying...")
                 print(f"⚠️ Failed to update research status (Attempt {attempt+1}/3): {e}. Retrying in 2s...")
-                import time
                 time.sleep(2.0)
             else:
                 logger.error(f"Failed to update research status: {e}")
 
+async def update_research_status_async(user_id: int, resume_filename: str, status: str, last_log: str = None):
+    """Awaitable update_research_status: runs the blocking Supabase round trips off the event loop."""
+    await run_io(update_research_status, user_id, resume_filename, status, last_log=last_log)
+
+# Strong refs to in-flight background status writes (the event loop only holds weak refs)
+_status_tasks = set()
+
+def update_research_status_nowait(user_id: int, resume_filename: str, status: str, last_log: str = None) -> asyncio.Task:
+    """Schedules update_research_status in the background and returns its Task without waiting on it."""
+    task = asyncio.create_task(update_research_status_async(user_id, resume_filename, status, last_log=last_log))
+    _status_tasks.add(task)
+    task.add_done_callback(_status_tasks.discard)
+    return task
 
 
 async def check_cancellation(user_id: int, resume_filename: str):
     """Checks if the research task has been cancelled by the user."""
+    global _status_read_rpc_available
     try:
-        response = supabase_service.client.table("profiles").select("profile_data").eq("user_id", user_id).execute()
+        if _status_read_rpc_available:
+            try:
+                # Fetches just the status string instead of the whole profile_data document
+                response = await run_io(
+                    supabase_service.client.rpc("get_research_status", {"p_user_id": user_id, "p_resume": resume_filename}).execute
+                )
+                return response.data == "CANCEL_REQUESTED"
+            except APIError as e:
+                if e.code != "PGRST202":
+                    raise
+                print("⚠️ get_research_status RPC not found, falling back to profile_data read")
+                _status_read_rpc_available = False
+
+        response = await run_io(
+            supabase_service.client.table("profiles").select("profile_data").eq("user_id", user_id).execute
+        )
         if response.data:
             data = response.data[0].get("profile_data", {})
             status_entry = data.get("research_status", {}).get(resume_filename, {})
@@ -76,107 +202,148 @@ async def check_cancellation(user_id: int, resume_filename: str):
         pass
     return False
 
-async def run_research_pipeline(user_id: int, resume_filename: str, api_key: str, limit: int = 20, job_title: str = None, location: str = None, session_id: int = None, allow_dispatch: bool = True):
+async def _parse_resume_cached(parser, file_bytes: bytes):
+    """Parses the resume with Gemini unless this exact PDF (by SHA-256) was parsed before."""
+    digest = hashlib.sha256(file_bytes).hexdigest()
+    cached = await run_io(supabase_service.get_cached_resume_parse, digest)
+    if cached:
+        print("⚡ Using cached resume parse")
+        return cached
+
+    parsed = await parser.parse_bytes(file_bytes)
+    if parsed and isinstance(parsed, str):
+        await run_io(supabase_service.cache_resume_parse, digest, parsed)
+    return parsed
+
+async def _drain_pending(tasks: set):
+    """Awaits background broadcast/status tasks, reporting (not raising) their failures."""
+    if not tasks:
+        return
+    for result in await asyncio.gather(*tasks, return_exceptions=True):
+        if isinstance(result, Exception):
+            print(f"⚠️ Background status/broadcast failed: {result}")
+    tasks.clear()
+
+async def run_research_pipeline(user_id: int, resume_filename: str, api_key: str, limit: int = 20, job_title: str = None, location: str = None, session_id: int = None, allow_dispatch: bool = True, concurrency: int = 8):
     print(f"🕵️ Worker: Starting Research for {resume_filename} with limit {limit} (Type: Google)...")
-    
+
+    # Informational status writes and live broadcasts are not awaited; they are drained before the pipeline returns
+    pending_status = set()
+
     # Broadcast Function helper
     async def log(msg, type="log", status="SEARCHING"):
         if session_id:
-            await log_stream_manager.broadcast(str(session_id), msg, type=type)
+            # Fire-and-forget so a slow subscriber never stalls the pipeline (tasks start in order)
+            pending_status.add(asyncio.create_task(log_stream_manager.broadcast(str(session_id), msg, type=type)))
         
         # Sync simple log to profile for non-session listeners (Dashboard UI)
         # We only do this for major info logs to avoid DB Thrashing
         if type in ["log", "complete", "error", "warning"]:
              # Run in background to not block
              # FIX: Use the passed 'status' argument instead of hardcoded "SEARCHING"
-             asyncio.create_task(asyncio.to_thread(update_research_status, user_id, resume_filename, status, last_log=msg))
+             pending_status.add(update_research_status_nowait(user_id, resume_filename, status, last_log=msg))
 
     await log(f"Starting research pipeline for {resume_filename}...")
     
     # Cloud Dispatch Check
-    cloud_url = os.getenv("CLOUD_RUN_URL")
+    cloud_url = CLOUD_RUN_URL
     
     # Debug Logging for Dispatch Decision
     if allow_dispatch:
         if not cloud_url:
             print("⚠️ Cloud Dispatch Skipped: CLOUD_RUN_URL not set in environment.")
-        elif os.getenv("IS_CLOUD_WORKER"):
+        elif IS_CLOUD_WORKER:
              print("ℹ️ Cloud Dispatch Skipped: Already running in Cloud Worker.")
              
-    if allow_dispatch and cloud_url and not os.getenv("IS_CLOUD_WORKER"):
-        import httpx
+    if allow_dispatch and cloud_url and not IS_CLOUD_WORKER:
         print(f"🚀 Dispatching Research task to Cloud Worker: {cloud_url}")
         await log("Dispatching to Cloud Worker...")
         
         try:
-            async with httpx.AsyncClient() as client:
-                payload = {
-                    "type": "research",
-                    "user_id": user_id,
-                    "resume_filename": resume_filename,
-                    "api_key": api_key,
-                    "limit": limit,
-                    "job_title": job_title,
-                    "location": location,
-                    "session_id": session_id
-                }
-                headers = {"x-worker-secret": os.getenv("WORKER_SECRET", "")}
-                
-                # TIMEOUT FIX: Increase to 300s (5 min) to match Cloud Run max
-                resp = await client.post(f"{cloud_url}/api/worker/task", json=payload, headers=headers, timeout=300.0)
-                
-                if resp.status_code != 200:
-                    print(f"❌ Cloud Dispatch Failed: {resp.text}")
-                    await log("Cloud dispatch failed, running locally...", type="warning")
-                else:
-                    return # Successfully dispatched
+            payload = {
+                "type": "research",
+                "user_id": user_id,
+                "resume_filename": resume_filename,
+                "api_key": api_key,
+                "limit": limit,
+                "job_title": job_title,
+                "location": location,
+                "session_id": session_id,
+                "concurrency": concurrency
+            }
+            
+            # TIMEOUT FIX: Increase to 300s (5 min) to match Cloud Run max
+            resp = await _dispatch_http.post(WORKER_TASK_URL, json=payload, timeout=300.0)
+            
+            if resp.status_code != 200:
+                print(f"❌ Cloud Dispatch Failed: {resp.text}")
+                await log("Cloud dispatch failed, running locally...", type="warning")
+            else:
+                await _drain_pending(pending_status)
+                return # Successfully dispatched
 
         except httpx.ReadTimeout:
              # CRITICAL FIX: If it times out, it likely IS running on cloud, just taking long.
              # DONT run locally, just log and exit.
              print("⏳ Cloud Dispatch timed out waiting for response (Task likely running).")
              await log("Task dispatched to cloud (running in background)...", type="log")
+             await _drain_pending(pending_status)
              return
 
         except Exception as e:
              print(f"❌ Cloud Dispatch Error: {traceback.format_exc()}")
              await log(f"Cloud dispatch error: {e}, running locally...", type="warning")
 
-    update_research_status(user_id, resume_filename, "SEARCHING", last_log="Starting local research...")
+    if _research_sem.locked():
+        await log("Waiting for a free research slot...")
+    await _research_sem.acquire()
+
+    # Cancellation arrives via Realtime when available; checkpoints only poll as a fallback
+    watcher = CancellationWatcher(user_id, resume_filename, check_cancellation)
 
     try:
+        await watcher.start()
+
         # CANCELLATION CHECK
-        if await check_cancellation(user_id, resume_filename): raise asyncio.CancelledError()
+        if await watcher.is_cancelled(): raise asyncio.CancelledError()
 
-        # 1. Download Resume File
+        # 1. Download Resume File (the SEARCHING status write goes out in the background)
         remote_path = f"{user_id}/{resume_filename}"
+        pending_status.add(update_research_status_nowait(user_id, resume_filename, "SEARCHING", last_log="Starting local research..."))
 
         try:
-            file_bytes = supabase_service.download_file(remote_path)
+            file_bytes = await run_io(supabase_service.download_file, remote_path)
         except Exception as dl_error:
             print(f"❌ Failed to download resume: {dl_error}")
-            update_research_status(user_id, resume_filename, "FAILED")
+            await update_research_status_async(user_id, resume_filename, "FAILED")
             return
 
-        # Save temp for parsing
         await log("Downloading resume file...")
-        import uuid
-        tmp_id = str(uuid.uuid4())
-        tmp_path = f"/tmp/{tmp_id}_{resume_filename}"
-
-        with open(tmp_path, "wb") as f:
-            f.write(file_bytes)
 
         # CANCELLATION CHECK
-        if await check_cancellation(user_id, resume_filename): raise asyncio.CancelledError()
+        if await watcher.is_cancelled(): raise asyncio.CancelledError()
 
         # 2. Parse Resume (Dynamic)
+        # Agent modules pull in browser_use/Playwright; import on first use, not at module load
         from app.utils.resume_parser import ResumeParser
+        from app.agents.google_researcher import GoogleResearcherAgent
+        from app.agents.matcher import MatcherAgent
         parser = ResumeParser(api_key=api_key)
 
         # Parse returns a JSON string, we need to load it
         await log("Parsing resume with Gemini 2.5 Flash...")
-        parsed_json_str = await parser.parse_to_json(tmp_path)
+        parse_task = asyncio.create_task(_parse_resume_cached(parser, file_bytes))
+
+        # Build the Researcher/Matcher (LLM client setup) while Gemini parses
+        try:
+            researcher, matcher = await asyncio.gather(
+                asyncio.to_thread(GoogleResearcherAgent, api_key=api_key),
+                asyncio.to_thread(MatcherAgent, api_key=api_key)
+            )
+        except BaseException:
+            parse_task.cancel()
+            raise
+        parsed_json_str = await parse_task
 
         # Guard against Non-string return (e.g. None)
         if not parsed_json_str or not isinstance(parsed_json_str, str):
@@ -184,150 +351,162 @@ async def run_research_pipeline(user_id: int, resume_filename: str, api_key: str
             profile_blob = {"raw_text": "Parsing Failed or Empty Response"}
         else:
             try:
-                profile_blob = json.loads(parsed_json_str)
-            except json.JSONDecodeError:
+                profile_blob = orjson.loads(parsed_json_str)
+            except orjson.JSONDecodeError:
                 # Fallback cleaning
-                import re
-                match = re.search(r'```json\n(.*?)\n```', parsed_json_str, re.DOTALL)
+                match = _JSON_FENCE_RE.search(parsed_json_str)
                 if match:
-                    profile_blob = json.loads(match.group(1))
+                    profile_blob = orjson.loads(match.group(1))
                 else:
                     profile_blob = {"raw_text": parsed_json_str} # Fallback
 
-        # Clean up temp file
-        if os.path.exists(tmp_path):
-            try:
-                os.remove(tmp_path)
-            except:
-                pass
-
         print(f"📄 Parsed Profile for {resume_filename}: {profile_blob.get('full_name', 'Unknown')}")
 
         # CANCELLATION CHECK
-        if await check_cancellation(user_id, resume_filename): raise asyncio.CancelledError()
+        if await watcher.is_cancelled(): raise asyncio.CancelledError()
 
         # 3. Research
         print("🔎 Using Google Verification Agent...")
         await log(f"Searching Google for top {limit} jobs (this may take a moment)...")
-        researcher = GoogleResearcherAgent(api_key=api_key)
         
         # Define Callback
         async def cancel_check_cb():
-            return await check_cancellation(user_id, resume_filename)
+            return await watcher.is_cancelled()
              
-        # We use the DYNAMIC profile_blob here
-        leads = await researcher.gather_leads(profile_blob, limit=limit, job_title=job_title, location=location, should_stop_callback=cancel_check_cb, log_callback=log)
-
-        # Prefix query_source for UI identification
-        prefix = "GOOGLE"
-        for lead in leads:
-            lead['query_source'] = f"{prefix}|{lead.get('query_source', 'Unknown')}"
-
-        # CANCELLATION CHECK
-        if await check_cancellation(user_id, resume_filename): raise asyncio.CancelledError()
-
-        # 4. Match
-        await log(f"Found {len(leads)} raw leads. analyzing matches with Matcher Agent...")
-        matcher = MatcherAgent(api_key=api_key)
-        # Fix: Use the requested limit, not hardcoded 10
-        scored_matches = await matcher.filter_and_score_leads(leads, profile_blob, limit=limit)
+        # 4. Match (overlapped with research: each lead is scored as soon as its search query finishes)
+        lead_queue = asyncio.Queue()
+        # A researcher/matcher failure surfaces as the underlying error, not an ExceptionGroup
+        try:
+            async with asyncio.TaskGroup() as tg:
+                # Fix: Use the requested limit, not hardcoded 10
+                scoring = tg.create_task(matcher.score_lead_stream(lead_queue, profile_blob, limit=limit, concurrency=concurrency))
+                try:
+                    # We use the DYNAMIC profile_blob here
+                    # query_source is prefixed "GOOGLE|" for UI identification as leads are built
+                    leads = await researcher.gather_leads(profile_blob, limit=limit, job_title=job_title, location=location, should_stop_callback=cancel_check_cb, log_callback=log, source_prefix="GOOGLE", on_lead=lead_queue.put)
+                finally:
+                    lead_queue.put_nowait(None) # end of stream
+
+                # CANCELLATION CHECK (stops in-flight scoring too)
+                if await watcher.is_cancelled(): raise asyncio.CancelledError()
+
+                await log(f"Found {len(leads)} raw leads. Finishing match analysis with Matcher Agent...")
+        except ExceptionGroup as eg:
+            raise eg.exceptions[0]
+        scored_matches = scoring.result()
 
         # 5. Save Results
         # Save to Storage as JSON (Legacy Backup) & DB
         results_filename = f"matches_{resume_filename}.json"
 
-        # Serialize
-        json_bytes = json.dumps(scored_matches, indent=2).encode('utf-8')
-
-        supabase_service.upload_file(
-            file_content=json_bytes,
-            file_name=results_filename,
-            user_id=user_id,
-            content_type="application/json"
+        # Serialize (compact; the backup is machine-read, pretty-print with jq if needed)
+        json_bytes = orjson.dumps(scored_matches)
+
+        # Storage backup and DB save are independent -> run concurrently
+        await asyncio.gather(
+            run_io(
+                supabase_service.upload_file,
+                file_content=json_bytes,
+                file_name=results_filename,
+                user_id=user_id,
+                content_type="application/json"
+            ),
+            run_io(supabase_service.save_leads_bulk, user_id, resume_filename, scored_matches)
         )
 
-        # Save to DB
-        supabase_service.save_leads_bulk(user_id, resume_filename, scored_matches)
-
         print(f"✅ Worker: Research Completed. Saved {len(scored_matches)} matches.")
         # FINAL STATUS UPDATE handled by log? No, we do it explicitly below.
         # But we must update 'status' to COMPLETED.
         
         await log(f"Done! Found {len(scored_matches)} matches.", type="complete", status="COMPLETED")
         if session_id:
-            supabase_service.save_chat_message(session_id, "model", f"✅ Research Complete! Found **{len(scored_matches)}** matches.\n\nCheck the **Jobs** tab or reload your dashboard.")
+            await run_io(supabase_service.save_chat_message, session_id, "model", f"✅ Research Complete! Found **{len(scored_matches)}** matches.\n\nCheck the **Jobs** tab or reload your dashboard.")
 
     except asyncio.CancelledError:
         print(f"🛑 Worker: Research Cancelled for {resume_filename}")
         # RACE CONDITION FIX: Explicitly set status to CANCELLED here via log
         await log("Research cancelled by user.", type="error", status="CANCELLED")
         if session_id:
-            supabase_service.save_chat_message(session_id, "model", "🛑 Research Cancelled by user.")
+            await run_io(supabase_service.save_chat_message, session_id, "model", "🛑 Research Cancelled by user.")
         # Redundant but safe update
-        update_research_status(user_id, resume_filename, "CANCELLED")
+        await update_research_status_async(user_id, resume_filename, "CANCELLED")
         
     except Exception as e:
         print(f"❌ Worker: Research Failed: {e}")
         traceback.print_exc()
         if session_id:
-            supabase_service.save_chat_message(session_id, "model", f"❌ Research Failed: {e}")
+            await run_io(supabase_service.save_chat_message, session_id, "model", f"❌ Research Failed: {e}")
             
         # Ensure we update status to FAILED so UI unblocks
         try:
-            update_research_status(user_id, resume_filename, "FAILED")
+            await update_research_status_async(user_id, resume_filename, "FAILED")
         except Exception as status_err:
              print(f"❌ Failed to final update status: {status_err}")
 
+    finally:
+        await watcher.stop()
+        _research_sem.release()
+        await _drain_pending(pending_status)
+
+
+# One scan over the applier's result. Priority: dry run > explicit failure > applied.
+# Failure markers are case-insensitive; exact JSON statuses must be the whole string.
+_APPLY_RESULT_RE = re.compile(
+    r"(?P<dry>DryRun)"
+    r"|(?P<fail>(?i:FAIL|ERROR|COULD NOT BE FULLY COMPLETED))"
+    r"|(?P<ok>Submitted|Success|^(?:APPLIED|SUBMITTED|SUCCESS)$)"
+)
 
-async def run_applier_task(job_url: str, resume_path: str, user_profile: dict, api_key: str, resume_filename: str = None, execution_mode: str = "local", session_id: int = None, instructions: str = None, allow_dispatch: bool = True):
+def _final_lead_status(result_status) -> str:
+    """Maps ApplierAgent.apply's result to the lead's final status (FAILED unless clearly applied)."""
+    found = {m.lastgroup for m in _APPLY_RESULT_RE.finditer(str(result_status))}
+    if "dry" in found: return "DRY_RUN"
+    if "ok" in found and "fail" not in found: return "APPLIED"
+    return "FAILED"
+
+async def run_applier_task(user_id: int, job_url: str, resume_path: str, user_profile: dict, api_key: str, resume_filename: str = None, execution_mode: str = "local", session_id: int = None, instructions: str = None, allow_dispatch: bool = True):
     print(f"🚀 Worker: Applying to {job_url} ...")
     
     async def log(msg, type="log"):
          if session_id: await log_stream_manager.broadcast(str(session_id), msg, type=type)
 
     if session_id:
-        supabase_service.save_chat_message(session_id, "model", f"🚀 Starting Application to **{job_url}**...")
+        await run_io(supabase_service.save_chat_message, session_id, "model", f"🚀 Starting Application to **{job_url}**...")
         await log(f"Initializing application agent for: {job_url}")
 
-    # Resolve User ID early for dispatch
-    user_id = user_profile.get("user_id") or user_profile.get("id")
-
     # Cloud Dispatch Check
-    cloud_url = os.getenv("CLOUD_RUN_URL")
+    cloud_url = CLOUD_RUN_URL
     # Only dispatch if we are not ALREADY in the cloud worker AND execution_mode indicates a cloud/managed environment
     should_dispatch = execution_mode in ['cloud_run', 'browser_use_cloud', 'browser_use']
     
-    if allow_dispatch and cloud_url and not os.getenv("IS_CLOUD_WORKER") and should_dispatch:
-        import httpx
+    if allow_dispatch and cloud_url and not IS_CLOUD_WORKER and should_dispatch:
         print(f"🚀 Dispatching Applier task to Cloud Worker: {cloud_url} (Mode: {execution_mode})")
         await log(f"Dispatching Applier to Cloud Worker ({execution_mode})...")
         
         try:
-            async with httpx.AsyncClient() as client:
-                payload = {
-                    "type": "apply",
-                    "user_id": user_id,
-                    "job_url": job_url,
-                    # We pass resume_filename so worker downloads from Supabase
-                    "resume_filename": resume_filename,
-                    "user_profile": user_profile,
-                    "api_key": api_key,
-                    "execution_mode": execution_mode, # Pass the requested mode to the worker
-                    "session_id": session_id,
-                    "instructions": instructions
-                }
-                headers = {"x-worker-secret": os.getenv("WORKER_SECRET", "")}
-                
-                # TIMEOUT FIX: Increase to 300s (5 min) matches Cloud Run max
-                resp = await client.post(f"{cloud_url}/api/worker/task", json=payload, headers=headers, timeout=300.0)
-                
-                if resp.status_code != 200:
-                    print(f"❌ Cloud Dispatch Failed: {resp.text}")
-                    await log(f"❌ Cloud Execution Failed (Status {resp.status_code}). Check Cloud Run logs.", type="error")
-                    # CRITICAL: DO NOT FALLBACK TO LOCAL if cloud was requested
-                    return f"FAILED_DISPATCH: Cloud Worker returned {resp.status_code}"
-                else:
-                    return {"status": "Dispatched", "worker": cloud_url}
+            payload = {
+                "type": "apply",
+                "user_id": user_id,
+                "job_url": job_url,
+                # We pass resume_filename so worker downloads from Supabase
+                "resume_filename": resume_filename,
+                "user_profile": user_profile,
+                "api_key": api_key,
+                "execution_mode": execution_mode, # Pass the requested mode to the worker
+                "session_id": session_id,
+                "instructions": instructions
+            }
+            
+            # TIMEOUT FIX: Increase to 300s (5 min) matches Cloud Run max
+            resp = await _dispatch_http.post(WORKER_TASK_URL, json=payload, timeout=300.0)
+            
+            if resp.status_code != 200:
+                print(f"❌ Cloud Dispatch Failed: {resp.text}")
+                await log(f"❌ Cloud Execution Failed (Status {resp.status_code}). Check Cloud Run logs.", type="error")
+                # CRITICAL: DO NOT FALLBACK TO LOCAL if cloud was requested
+                return f"FAILED_DISPATCH: Cloud Worker returned {resp.status_code}"
+            else:
+                return {"status": "Dispatched", "worker": cloud_url}
 
         except httpx.ReadTimeout:
              # If it times out, it likely IS running on cloud, just taking long.
@@ -342,37 +521,32 @@ async def run_applier_task(job_url: str, resume_path: str, user_profile: dict, a
              return f"FAILED_DISPATCH: {e}"
 
     # If we are here, we are running LOCALLY (or we are the worker, or mode is 'local')
-    if execution_mode in ['cloud_run', 'browser_use_cloud'] and not os.getenv("IS_CLOUD_WORKER"):
+    if execution_mode in ['cloud_run', 'browser_use_cloud'] and not IS_CLOUD_WORKER:
          # If we somehow fell through here but wanted cloud, STOP.
          # This handles case where cloud_url is missing
          print(f"🛑 Execution Mode '{execution_mode}' requested but Cloud Dispatch failed or not configured.")
          await log("❌ Failed to dispatch to cloud (configuration/network error). Stopping to avoid local execution.", type="error")
          return "FAILED_DISPATCH_NO_FALLBACK"
 
-    # Resolve Lead ID for status updates
-    # user_id already resolved above
-    
     try:
         # Detect environment for headless mode
-        is_headless = os.getenv("HEADLESS", "false").lower() == "true"
-        is_cloud = os.getenv("IS_CLOUD_WORKER") == "true"
+        is_headless = HEADLESS
+        is_cloud = IS_CLOUD_WORKER == "true"
         status_suffix = "(Cloud)" if is_cloud else "(Local)"
         
         # Resolve Lead ID for status updates
         lead_id = None
         if user_id:
-            # Use new method that handles fetch properly
-            lead = supabase_service.get_lead_by_url(user_id, job_url)
-            if lead:
-                lead_id = lead['id']
+            # Look up the lead and mark it APPLYING in a single call
+            lead_id = await run_io(supabase_service.claim_lead_by_url, user_id, job_url, f"APPLYING {status_suffix}", resume_filename=resume_filename)
+            if lead_id:
                 print(f"📋 Found Lead ID: {lead_id}")
-                # Use specific ID update
-                supabase_service.update_lead_status(lead_id, f"APPLYING {status_suffix}", user_id=user_id, resume_filename=resume_filename)
             else:
                 print("⚠️ Could not find existing lead for this URL. Status updates will be skipped.")
         else:
             print("⚠️ No User ID found in profile. Cannot resolve lead.")
 
+        from app.agents.applier import ApplierAgent
         applier = ApplierAgent(api_key=api_key, headless=is_headless)
         
         # Determine Managed Browser (Browser Use Cloud) usage
@@ -385,41 +559,33 @@ async def run_applier_task(job_url: str, resume_path: str, user_profile: dict, a
         await log(f"Launching browser (Headless={is_headless}, Managed Cloud={use_managed_browser})...")
         
         # Pass lead_id and instructions to apply method
-        result_status = await applier.apply(job_url, user_profile, resume_path, lead_id=lead_id, use_managed_browser=use_managed_browser, session_id=session_id, instructions=instructions)
+        async with _apply_sem:
+            result_status = await applier.apply(job_url, user_profile, resume_path, lead_id=lead_id, use_managed_browser=use_managed_browser, session_id=session_id, instructions=instructions)
         
         print(f"🏁 Worker: Applier finished: {result_status}")
         
-        await log(f"Application finished: {result_status}", type="complete")
+        # Live broadcast, chat persistence and the lead verdict are independent -> one concurrent step
+        final_writes = [log(f"Application finished: {result_status}", type="complete")]
         if session_id:
-            supabase_service.save_chat_message(session_id, "model", f"🏁 Application Finished. Status: **{result_status}**")
+            final_writes.append(run_io(supabase_service.save_chat_message, session_id, "model", f"🏁 Application Finished. Status: **{result_status}**"))
         
         if lead_id:
-             # Default to FAILED safest
-             final_status = "FAILED"
-             
-             # 1. Trust JSON status if available and valid
-             if isinstance(result_status, str) and result_status in ["APPLIED", "SUBMITTED", "SUCCESS"]:
-                 final_status = "APPLIED"
-             elif "Submitted" in str(result_status) or "Success" in str(result_status):
-                 final_status = "APPLIED"
-             
-             # 2. Overrule if explicit failure is detected
-             if "FAIL" in str(result_status).upper() or "ERROR" in str(result_status).upper() or "COULD NOT BE FULLY COMPLETED" in str(result_status).upper():
-                 final_status = "FAILED"
-                 
-             if "DryRun" in str(result_status): final_status = "DRY_RUN"
-             
+             final_status = _final_lead_status(result_status)
              print(f"✅ Final Status Verdict: {final_status}")
-             supabase_service.update_lead_status(lead_id, final_status, user_id=user_id, resume_filename=resume_filename)
+             final_writes.append(run_io(supabase_service.update_lead_status, lead_id, final_status, user_id=user_id, resume_filename=resume_filename))
+
+        await asyncio.gather(*final_writes)
 
     except asyncio.CancelledError:
         print(f"🛑 Worker: Applier Cancelled for {job_url}")
+        cancel_writes = []
         if session_id:
-            supabase_service.save_chat_message(session_id, "model", "🛑 Application Cancelled by user.")
+            cancel_writes.append(run_io(supabase_service.save_chat_message, session_id, "model", "🛑 Application Cancelled by user."))
         if lead_id:
-            supabase_service.update_lead_status(lead_id, "CANCELLED", user_id=user_id, resume_filename=resume_filename)
+            cancel_writes.append(run_io(supabase_service.update_lead_status, lead_id, "CANCELLED", user_id=user_id, resume_filename=resume_filename))
+        await asyncio.gather(*cancel_writes)
 
     except Exception as e:
         print(f"❌ Worker: Applier Failed: {e}")
         if lead_id:
-            supabase_service.update_lead_status(lead_id, "FAILED", user_id=user_id, resume_filename=resume_filename)
+            await run_io(supabase_service.update_lead_status, lead_id, "FAILED", user_id=user_id, resume_filename=resume_filename)
@@ -0,0 +1,76 @@
+import os
+import uuid
+import asyncio
+import logging
+from typing import Dict, Any, Optional
+from app.services.supabase_client import supabase_service
+from app.services.agent_runner import run_applier_task
+from app.services.browser_resolver import resolver
+from app.services.io_pool import run_io
+
+logger = logging.getLogger(__name__)
+
+async def _download_resume(remote_path: str, tmp_path: str):
+    """Streams the resume from Storage into tmp_path."""
+    logger.info("Downloading resume for application: %s", remote_path)
+    await run_io(supabase_service.download_file_to, remote_path, tmp_path)
+
+async def _warm_up_job_url(job_url: str):
+    """Pre-resolves the ATS URL so the applier's own resolve_job_url hits the cache."""
+    try:
+        await resolver.resolve_job_url(job_url)
+    except Exception as e:
+        logger.warning("URL warm-up failed (applier will retry): %s", e)
+
+async def prepare_and_run_apply(payload: Dict[str, Any], api_key: str, allow_dispatch: bool = True):
+    """
+    Shared "apply" flow for the CLI and the Cloud Worker:
+    downloads the resume to /tmp, runs the applier, then removes the temp file.
+    Payload keys mirror TaskPayload (user_id, job_url, resume_filename, user_profile, ...).
+    Raises on download/apply errors so callers can map them to their own failure handling.
+    """
+    user_profile: Dict[str, Any] = payload.get("user_profile") or {}
+    resume_filename: str = payload.get("resume_filename")
+
+    user_id: Optional[int] = payload.get("user_id") or user_profile.get("user_id") or user_profile.get("id")
+    if user_id:
+        user_profile["user_id"] = user_id # Ensure ID is passed for lead lookup
+    else:
+        logger.warning("No user_id found for resume download. Proceeding might fail if file needed.")
+
+    # Priority: explicit execution_mode, else legacy use_cloud flag
+    execution_mode = payload.get("execution_mode") or "local"
+    if execution_mode == "local" and payload.get("use_cloud"):
+        execution_mode = "browser_use_cloud"
+
+    job_url = payload.get("job_url")
+    # Only warm up URL resolution if the applier will run in this process
+    runs_here = not allow_dispatch or execution_mode == "local"
+
+    # URL resolution runs in the background; the applier's own resolve_job_url joins it
+    # (singleflight) instead of the download waiting on a possibly slow browser resolution
+    warm_up = asyncio.create_task(_warm_up_job_url(job_url)) if runs_here and job_url else None
+
+    tmp_path = f"/tmp/apply_{uuid.uuid4()}_{resume_filename}"
+    try:
+        await _download_resume(f"{user_id}/{resume_filename}", tmp_path)
+
+        logger.info("Starting Apply Task: URL=%s", job_url)
+        return await run_applier_task(
+            user_id=user_id,
+            job_url=job_url,
+            resume_path=tmp_path,
+            user_profile=user_profile,
+            api_key=api_key,
+            resume_filename=resume_filename,
+            execution_mode=execution_mode,
+            session_id=payload.get("session_id"),
+            instructions=payload.get("instructions"),
+            allow_dispatch=allow_dispatch
+        )
+    finally:
+        if warm_up and not warm_up.done():
+            # Only drops this waiter; the shared resolution keeps running and gets cached
+            warm_up.cancel()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
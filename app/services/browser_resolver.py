@@ -1,19 +1,125 @@
 import os
 import asyncio
-import requests
+import httpx
 import re
+import time
+from typing import Dict, Optional, Tuple
 from urllib.parse import urlparse
+from bs4 import BeautifulSoup
 from google import genai
 from playwright.async_api import async_playwright
+from app.services.io_pool import run_io
 
 KNOWN_ATS = ["greenhouse.io", "lever.co", "workday.com", "ashbyhq.com", "bamboohr.com", "smartrecruiters.com", "icims.com"]
 KNOWN_AGGREGATORS = ["adzuna.com", "indeed.com", "linkedin.com", "ziprecruiter.com", "glassdoor.com"]
 
+BROWSER_USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+
+# Shared HTTP/2 client: keeps connections alive across resolutions (closed on app shutdown)
+_http = httpx.AsyncClient(
+    http2=True,
+    timeout=15,
+    follow_redirects=True,
+    headers={"User-Agent": BROWSER_USER_AGENT}
+)
+
+# Upper bound for JS redirects to settle after the initial navigation
+REDIRECT_WAIT_MS = 10000
+
+# Resolved URL cache (raw_url -> final ATS URL)
+RESOLVED_URL_CACHE_TTL = 3600 # seconds
+RESOLVED_URL_CACHE_MAX = 1024
+
+# Link/button text worth showing the LLM when hunting for the apply target
+_APPLY_TEXT_RE = re.compile(r'appl|start application|company site|employer|click here|continue', re.I)
+_JS_REDIRECT_RE = re.compile(r'window\.location[^;<]{0,300}', re.I)
+# Hrefs kept regardless of link text: block-page bypasses (see prompt rule 6)
+_REDIRECT_HREF_RE = re.compile(r'redirect|click|authenticate', re.I)
+# Scripts, stylesheets, images and fonts served from ATS CDNs are never the apply target
+_ASSET_PATH_RE = re.compile(r'\.(?:js|mjs|css|png|jpe?g|gif|svg|webp|ico|woff2?|ttf|eot|map)$', re.I)
+APPLY_SNIPPET_MAX_CHARS = 8000
+APPLY_SNIPPET_CONTEXT_CHARS = 200
+
+def _is_ats_url(url: str) -> bool:
+    """True for an http(s) page on a known ATS host (not an asset, not an ATS name in a query string)."""
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or _ASSET_PATH_RE.search(parsed.path):
+        return False
+    host = parsed.netloc.lower().split(":")[0]
+    return any(host == ats or host.endswith("." + ats) for ats in KNOWN_ATS)
+
+def _scan_apply_html(html: str, fallback_chars: int) -> Tuple[Optional[str], str]:
+    """
+    Parses the page once and returns (ats_url, apply_html):
+    - ats_url: href of the first apply-like <a> that points at a known ATS page, or None.
+    - apply_html: the apply-like <a>/<button> elements (plus a little surrounding text),
+      redirect/authenticate links, meta refreshes and JS redirects, capped at
+      APPLY_SNIPPET_MAX_CHARS; plain truncation if nothing matches. Sent to the LLM.
+    CPU-bound (parses the whole page): call it through run_io from async code.
+    """
+    try:
+        soup = BeautifulSoup(html, "html.parser")
+        ats_url = None
+        snippets = []
+        for node in soup.select("a[href], button"):
+            href = node.get("href", "")
+            is_apply = bool(_APPLY_TEXT_RE.search(node.get_text(" ", strip=True)))
+            if not (is_apply or _REDIRECT_HREF_RE.search(href)):
+                continue
+            if ats_url is None and is_apply and node.name == "a" and _is_ats_url(href):
+                ats_url = href
+            context = node.parent.get_text(" ", strip=True)[:APPLY_SNIPPET_CONTEXT_CHARS] if node.parent else ""
+            snippets.append(f"{node} <!-- context: {context} -->")
+        for meta in soup.select('meta[http-equiv="refresh" i]'):
+            snippets.append(str(meta))
+        snippets.extend(m.group(0) for m in _JS_REDIRECT_RE.finditer(html))
+
+        if snippets:
+            return ats_url, "\n".join(snippets)[:APPLY_SNIPPET_MAX_CHARS]
+    except Exception as e:
+        print(f"⚠️ Apply snippet extraction failed: {e}")
+
+    return None, html[:fallback_chars]
+
 class UrlResolver:
     def __init__(self, api_key: str):
         self.api_key = api_key
+        # Gemini client is built once on first use (api_key may be unset at import time)
+        self._client = None
         # We enforce headless for the server
         self.headless = True
+        # Singleflight: raw_url -> resolution Task shared by concurrent resolve_job_url callers
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # Cache: raw_url -> (resolved_url, timestamp)
+        self._resolved_cache: Dict[str, Tuple[str, float]] = {}
+
+    @property
+    def client(self) -> genai.Client:
+        """Shared Gemini client (reuses auth state and HTTP connections across calls)."""
+        if self._client is None:
+            self._client = genai.Client(api_key=self.api_key)
+        return self._client
+
+    async def _wait_for_redirect(self, page, start_url: str, timeout_ms: int = REDIRECT_WAIT_MS):
+        """
+        Waits until the page either goes network-idle or its URL changes,
+        whichever happens first (capped at timeout_ms).
+        """
+        waiters = [
+            asyncio.create_task(page.wait_for_load_state("networkidle", timeout=timeout_ms)),
+            asyncio.create_task(page.wait_for_function("start => location.href !== start", arg=start_url, timeout=timeout_ms)),
+        ]
+        try:
+            done, _ = await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                # Timeouts / destroyed contexts just mean "stop waiting"
+                if not task.cancelled() and task.exception():
+                    print(f"⏳ Redirect wait ended early: {task.exception()}")
+        finally:
+            for task in waiters:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*waiters, return_exceptions=True)
 
     async def resolve_url_with_browser(self, url: str) -> str:
         """
@@ -28,7 +134,7 @@ class UrlResolver:
                     args=["--disable-blink-features=AutomationControlled", "--no-sandbox", "--disable-infobars"]
                 )
                 context = await browser.new_context(
-                    user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
+                    user_agent=BROWSER_USER_AGENT,
                     locale="en-US"
                 )
                 page = await context.new_page()
@@ -40,8 +146,8 @@ class UrlResolver:
                 
                 try:
                     await page.goto(url, timeout=30000, wait_until="domcontentloaded")
-                    # Wait for JS redirects
-                    await page.wait_for_timeout(10000)
+                    # Wait for JS redirects (network idle OR URL change, no blind sleep)
+                    await self._wait_for_redirect(page, page.url)
                     
                     final_url = page.url
                     print(f"🌐 Browser Resolver landed on: {final_url}")
@@ -53,17 +159,14 @@ class UrlResolver:
                     print("⚠️ Still on aggregator. Scanning page content for hidden ATS links...")
                     content = await page.content()
                     
-                    # 1. Regex Scan
-                    for ats in KNOWN_ATS:
-                        match = re.search(r'https?://[^"\'\s>]*' + re.escape(ats) + r'[^"\'\s>]*', content)
-                        if match:
-                            found_url = match.group(0)
-                            print(f"🎯 Found hidden ATS link in DOM (Regex): {found_url}")
-                            return found_url
+                    # 1. Apply link that already points at an ATS (one parse, reused for the LLM)
+                    found_url, truncated_content = await run_io(_scan_apply_html, content, 50000)
+                    if found_url:
+                        print(f"🎯 Found hidden ATS link in DOM: {found_url}")
+                        return found_url
 
                     # 2. LLM Scan
                     print("🧠 Asking LLM to find the redirect/ATS link in the blocked page...")
-                    truncated_content = content[:50000] 
                     prompt = f"""
                     I am stuck on a job aggregator page (Adzuna) that failed to redirect.
                     Analyze the HTML below and find the DIRECT link to the applicant tracking system (ATS) or the employer's site.
@@ -79,9 +182,8 @@ class UrlResolver:
                     2. If not found, return 'NOT_FOUND'.
                     """
                     
-                    client = genai.Client(api_key=self.api_key)
                     response = await asyncio.to_thread(
-                        client.models.generate_content,
+                        self.client.models.generate_content,
                         model='gemini-2.5-flash',
                         contents=prompt
                     )
@@ -114,17 +216,20 @@ class UrlResolver:
 
         try:
             # 1. Fetch RAW HTML
-            def fetch_raw():
-                headers = {
-                    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-                }
-                response = requests.get(job_url, headers=headers, timeout=10, allow_redirects=True)
-                return response.text, response.url
+            response = await _http.get(job_url, timeout=10)
+            html_content, final_url = response.text, str(response.url)
 
-            html_content, final_url = await asyncio.to_thread(fetch_raw)
+            # 1.5. Cheap paths, no LLM: the redirects already landed on an ATS page,
+            # or the page's apply button links straight to one
+            if _is_ats_url(final_url):
+                print(f"🎯 Job URL already on an ATS: {final_url}")
+                return final_url
+            ats_url, apply_html = await run_io(_scan_apply_html, html_content, 100000)
+            if ats_url:
+                print(f"🎯 Found direct ATS apply link in HTML: {ats_url}")
+                return ats_url
 
             # 2. Ask the LLM
-            client = genai.Client(api_key=self.api_key)
 
             prompt = f"""
             I have the raw HTML content of a job posting page below.
@@ -138,11 +243,13 @@ class UrlResolver:
             5. If the URL is relative (starts with /), append it to the base domain: {final_url}
             6. If the page shows "Access Denied", "Security Check", or similar blockage, look for ANY link that contains "redirect", "click", "authenticate", or the job ID, which might bypass the block.
 
-            HTML Content (Truncated if too large):
-            {html_content[:100000]}
+            HTML Content (Apply links/buttons only, or truncated page):
+            {apply_html}
             """
 
-            response = client.models.generate_content(
+            # Sync SDK call -> default executor, keeps the event loop free
+            response = await asyncio.to_thread(
+                self.client.models.generate_content,
                 model='gemini-2.5-flash',
                 contents=prompt
             )
@@ -166,14 +273,10 @@ class UrlResolver:
                     print(f"⚠️ Detected Aggregator URL ({domain}). Attempting to follow redirects...")
                     
                     async def follow_redirects(url):
-                        headers = {
-                            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-                        }
                         try:
                             # 1. Standard Redirect Follow
-                            loop = asyncio.get_event_loop()
-                            r = await loop.run_in_executor(None, lambda: requests.get(url, headers=headers, allow_redirects=True, timeout=15))
-                            final_url = r.url
+                            r = await _http.get(url)
+                            final_url = str(r.url)
                             
                             # 2. Soft Redirect / Block Page Check
                             if "adzuna" in final_url or "Access Denied" in r.text or "Security Check" in r.text or "authenticate" in r.text:
@@ -226,8 +329,41 @@ class UrlResolver:
         """
         Takes a raw job link (e.g. from Adzuna), performs HTTP/Playwright/LLM analysis
         to find the direct ATS link, and returns the clean URL.
+        Concurrent calls for the same URL share one resolution; results are cached.
         """
-        return await self.resolve_application_url(raw_url)
+        cached = self._resolved_cache.get(raw_url)
+        if cached and time.time() - cached[1] < RESOLVED_URL_CACHE_TTL:
+            return cached[0]
+
+        task = self._inflight.get(raw_url)
+        if task is None:
+            # The resolution runs in its own task, so no single caller owns (or can cancel) it
+            task = asyncio.create_task(self._resolve_and_cache(raw_url))
+            self._inflight[raw_url] = task
+            task.add_done_callback(lambda t: self._resolution_done(raw_url, t))
+
+        # Shield so one waiter's cancellation doesn't cancel the shared resolution
+        return await asyncio.shield(task)
+
+    def _resolution_done(self, raw_url: str, task: asyncio.Task):
+        if self._inflight.get(raw_url) is task:
+            del self._inflight[raw_url]
+        if not task.cancelled():
+            task.exception() # Mark retrieved even if every waiter was cancelled
+
+    async def _resolve_and_cache(self, raw_url: str) -> str:
+        resolved = await self.resolve_application_url(raw_url)
+
+        # Only cache real resolutions (failures fall back to the raw URL)
+        if resolved and resolved != raw_url:
+            if len(self._resolved_cache) >= RESOLVED_URL_CACHE_MAX:
+                self._resolved_cache.pop(next(iter(self._resolved_cache)))
+            self._resolved_cache[raw_url] = (resolved, time.time())
+        return resolved
+
+    async def aclose(self):
+        """Closes the shared HTTP client (call once on shutdown)."""
+        await _http.aclose()
 
 # Initialize Resolver (Singleton)
 resolver = UrlResolver(api_key=os.getenv("GEMINI_API_KEY"))
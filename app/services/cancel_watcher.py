@@ -0,0 +1,130 @@
+import asyncio
+import time
+from typing import Awaitable, Callable
+from realtime import AsyncRealtimeClient, RealtimeSubscribeStates
+from app.services.supabase_client import SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY, SUPABASE_KEY
+
+CANCEL_SUBSCRIBE_TIMEOUT = 3 # seconds to wait for the Realtime socket to connect and the channel to join
+CANCEL_SAFETY_POLL_INTERVAL = 30 # seconds; polls even while subscribed in case an event is missed
+
+# One Realtime socket per event loop, shared by every pipeline's watcher (one channel each)
+_client = None
+_client_loop = None
+
+def _realtime_client() -> AsyncRealtimeClient:
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        key = SUPABASE_SERVICE_ROLE_KEY or SUPABASE_KEY
+        _client = AsyncRealtimeClient(f"{SUPABASE_URL.rstrip('/')}/realtime/v1", key, auto_reconnect=True)
+        _client_loop = loop
+    return _client
+
+async def aclose():
+    """Closes the shared Realtime socket (app shutdown)."""
+    global _client
+    client, _client = _client, None
+    if client is not None:
+        try:
+            await client.close()
+        except Exception:
+            pass
+
+class CancellationWatcher:
+    """
+    Watches one resume's research_status for CANCEL_REQUESTED.
+
+    Subscribes to Supabase Realtime postgres_changes on the user's profiles row, so a
+    checkpoint is a local Event check instead of a SELECT. The channel joins in the
+    background; until it is live, or if it can't be joined (not configured, table not
+    published, network), every checkpoint falls back to `poll`.
+    """
+    def __init__(self, user_id: int, resume_filename: str, poll: Callable[[int, str], Awaitable[bool]]):
+        self.user_id = user_id
+        self.resume_filename = resume_filename
+        self._poll = poll
+        self._event = asyncio.Event()
+        self._client = None
+        self._channel = None
+        self._join_task = None
+        self._live = False
+        self._last_poll = 0.0
+
+    async def start(self):
+        """Starts joining the cancel channel without waiting for it."""
+        key = SUPABASE_SERVICE_ROLE_KEY or SUPABASE_KEY
+        if not SUPABASE_URL or not key:
+            return
+        self._join_task = asyncio.create_task(self._subscribe())
+
+    async def _subscribe(self):
+        joined = asyncio.get_running_loop().create_future()
+
+        def on_state(state, err):
+            if not joined.done():
+                joined.set_result(state == RealtimeSubscribeStates.SUBSCRIBED)
+
+        async def join():
+            # subscribe() connects the socket first; the timeout covers both
+            await self._channel.subscribe(on_state)
+            return await joined
+
+        try:
+            self._client = _realtime_client()
+            # Unique per watcher: two runs for the same resume must not replace each other's channel
+            self._channel = self._client.channel(f"cancel:{self.user_id}:{self.resume_filename}:{id(self):x}")
+            self._channel.on_postgres_changes(
+                "UPDATE",
+                self._on_change,
+                table="profiles",
+                schema="public",
+                filter=f"user_id=eq.{self.user_id}"
+            )
+            self._live = await asyncio.wait_for(join(), CANCEL_SUBSCRIBE_TIMEOUT)
+        except Exception as e:
+            print(f"⚠️ Realtime cancel watch unavailable, polling instead: {e!r}")
+
+        if not self._live:
+            await self._leave()
+
+    def _on_change(self, payload):
+        record = (payload.get("data") or {}).get("record") or {}
+        research_status = (record.get("profile_data") or {}).get("research_status") or {}
+        if research_status.get(self.resume_filename, {}).get("status") == "CANCEL_REQUESTED":
+            self._event.set()
+
+    async def is_cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+
+        now = time.monotonic()
+        if self._live and now - self._last_poll < CANCEL_SAFETY_POLL_INTERVAL:
+            return False
+
+        self._last_poll = now
+        if await self._poll(self.user_id, self.resume_filename):
+            self._event.set()
+        return self._event.is_set()
+
+    async def stop(self):
+        if self._join_task is not None and not self._join_task.done():
+            self._join_task.cancel()
+            try:
+                await self._join_task
+            except asyncio.CancelledError:
+                pass
+        await self._leave()
+
+    async def _leave(self):
+        """Leaves this watcher's channel; the shared socket stays open for other pipelines."""
+        channel, self._channel = self._channel, None
+        was_live, self._live = self._live, False
+        if channel is None:
+            return
+        if was_live:
+            try:
+                await channel.unsubscribe()
+            except Exception:
+                pass
+        self._client.channels.pop(channel.topic, None)
+        self._client = None
@@ -0,0 +1,36 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+# Dedicated pool for blocking *network* I/O (requests, supabase-py).
+# Kept separate from the loop's default executor so HTTP/DB calls don't
+# queue behind Playwright bursts or long synchronous Gemini SDK calls.
+IO_POOL_MAX_WORKERS = 64
+
+io_pool = ThreadPoolExecutor(max_workers=IO_POOL_MAX_WORKERS, thread_name_prefix="io")
+
+# Bounded pool for asyncio.to_thread() (agent construction, sync Gemini calls).
+# The loop's implicit default is min(32, cpu+4) threads per process and grows with
+# every concurrent pipeline; 16 keeps CPU-ish work from thrashing. Together with
+# io_pool (64) and leads_write_pool (4) this stays under httpx's default 100-connection limit.
+DEFAULT_POOL_MAX_WORKERS = 16
+
+default_pool = ThreadPoolExecutor(max_workers=DEFAULT_POOL_MAX_WORKERS, thread_name_prefix="sb-io")
+
+# Leaf pool for the chunks of one bulk leads write. The bulk write itself runs on io_pool,
+# and waiting on io_pool from inside io_pool can deadlock it; nothing here submits further work.
+LEADS_WRITE_MAX_WORKERS = 4
+
+leads_write_pool = ThreadPoolExecutor(max_workers=LEADS_WRITE_MAX_WORKERS, thread_name_prefix="leads-write")
+
+def install_default_executor(loop: asyncio.AbstractEventLoop = None):
+    """Makes default_pool the loop's default executor. Call once at startup."""
+    (loop or asyncio.get_running_loop()).set_default_executor(default_pool)
+
+async def run_io(func, *args, **kwargs):
+    """
+    Runs a blocking I/O callable on the dedicated pool and awaits the result.
+    Drop-in for asyncio.to_thread() on network-bound work.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(io_pool, functools.partial(func, *args, **kwargs))
@@ -1,10 +1,27 @@
 import asyncio
-from typing import Dict, List, Any
+import functools
+from typing import Dict, List, Set, Any
 import logging
-from app.services.supabase_client import supabase_service
+from realtime import AsyncRealtimeClient, RealtimeSubscribeStates
+from app.services.supabase_client import supabase_service, SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY, SUPABASE_KEY
 
 logger = logging.getLogger(__name__)
 
+# Flushed chunks buffered per SSE subscriber; a client that falls this far behind is disconnected
+SUBSCRIBER_QUEUE_MAX = 512
+_CLOSE = object() # queued in place of the backlog to end a slow subscriber's stream
+SSE_FLUSH_INTERVAL = 0.05 # seconds; bursts of log lines reach each subscriber as one chunk
+SSE_CACHE_MAX_MESSAGE = 512 # longer (usually unique) messages skip the payload cache
+
+def _build_sse(type: str, message: str) -> bytes:
+    return f"event: {type}\ndata: {message}\n\n".encode("utf-8")
+
+# Status lines repeat many times per run; reuse their encoded frames
+_cached_sse = functools.lru_cache(maxsize=256)(_build_sse)
+REALTIME_JOIN_TIMEOUT = 3 # seconds to wait for a session's Realtime channel to join
+REALTIME_RETRY_BACKOFF = 30 # seconds a session stays on local SSE only after its channel failed to join
+REALTIME_CHANNEL_IDLE = 300 # seconds without messages before a session's channel is released
+
 class LogStreamManager:
     """
     Manages log streaming.
@@ -13,33 +30,49 @@ class LogStreamManager:
     2. Supabase Realtime Broadcast (for cross-instance/Cloud Run visibility)
     """
     def __init__(self):
-        # Maps session_id -> List of active queues
-        self._subscriptions: Dict[str, List[asyncio.Queue]] = {}
+        # Maps session_id -> Set of active queues (O(1) add/discard on connect/disconnect)
+        self._subscriptions: Dict[str, Set[asyncio.Queue]] = {}
+
+        # Encoded frames waiting for the next flush: session_id -> [bytes]
+        self._pending: Dict[str, List[bytes]] = {}
+        self._flush_handle = None
+        self._flush_loop = None
+
+        # Realtime Broadcast: one socket per process, one joined channel per active session
+        self._realtime_enabled = bool(SUPABASE_URL and (SUPABASE_SERVICE_ROLE_KEY or SUPABASE_KEY))
+        self._realtime_client = None
+        self._realtime_channels: Dict[str, asyncio.Future] = {}
+        self._realtime_tasks: Set[asyncio.Task] = set()
+        # session_id -> loop time before which a failed join is not retried
+        self._realtime_retry_at: Dict[str, float] = {}
+        # session_id -> timer releasing its channel after REALTIME_CHANNEL_IDLE without messages
+        self._realtime_idle: Dict[str, asyncio.TimerHandle] = {}
 
     async def subscribe(self, session_id: str):
         """
         Creates a new subscription queue for a given session.
         Returns an async generator that yields messages.
         """
-        queue = asyncio.Queue()
-        if session_id not in self._subscriptions:
-            self._subscriptions[session_id] = []
-        
-        self._subscriptions[session_id].append(queue)
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_MAX)
+        self._subscriptions.setdefault(session_id, set()).add(queue)
         
         try:
             while True:
                 # Wait for message
                 message = await queue.get()
+                if message is _CLOSE:
+                    print(f"🐢 Disconnecting slow client from stream {session_id}")
+                    return
                 yield message
                 queue.task_done()
         except asyncio.CancelledError:
             # Cleanup on disconnect
             print(f"🔌 Client disconnected from stream {session_id}")
         finally:
-            if session_id in self._subscriptions:
-                self._subscriptions[session_id].remove(queue)
-                if not self._subscriptions[session_id]:
+            queues = self._subscriptions.get(session_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
                     del self._subscriptions[session_id]
 
     async def broadcast(self, session_id: str, message: str, type: str = "log"):
@@ -47,47 +80,155 @@ class LogStreamManager:
         Broadcasts a message to all connected clients for a session.
         Also pushes to Supabase Realtime for distributed visibility.
         """
-        # 1. Local Broadcast
+        # 1. Local Broadcast: frames are buffered and fanned out together every SSE_FLUSH_INTERVAL
         if session_id in self._subscriptions:
-            payload = f"event: {type}\ndata: {message}\n\n"
-            queues = self._subscriptions[session_id]
-            for q in queues:
-                await q.put(payload)
+            # Encoded once; StreamingResponse writes bytes as-is for every subscriber
+            payload = _cached_sse(type, message) if len(message) < SSE_CACHE_MAX_MESSAGE else _build_sse(type, message)
+            loop = asyncio.get_running_loop()
+            if self._flush_loop is not loop:
+                # A handle left on another, finished loop never fires; its frames are stale
+                self._flush_loop, self._flush_handle, self._pending = loop, None, {}
+            self._pending.setdefault(session_id, []).append(payload)
+            if self._flush_handle is None:
+                self._flush_handle = loop.call_later(SSE_FLUSH_INTERVAL, self._flush)
                 
         # 2. Supabase Realtime Broadcast (Fire and Forget)
         # This allows the frontend (connected via Supabase JS) to receive logs 
         # even if this code runs on a Cloud Worker.
+        # Channel: 'session_{session_id}', Event: 'log', Payload: { 'message': message, 'type': type }
+        if self._realtime_enabled:
+            self._spawn_realtime(self._realtime_send(session_id, message, type))
+
+    def _flush(self):
+        """Hands each session's buffered frames to its subscribers as one chunk per queue."""
+        self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        for session_id, frames in pending.items():
+            queues = self._subscriptions.get(session_id)
+            if not queues:
+                continue
+            payload = frames[0] if len(frames) == 1 else b"".join(frames)
+            slow = []
+            for q in queues:
+                try:
+                    q.put_nowait(payload)
+                except asyncio.QueueFull:
+                    # Stalled client: drop it (and its backlog) instead of blocking the broadcaster
+                    logger.warning(f"Slow subscriber on stream {session_id}, closing it")
+                    slow.append(q)
+            for q in slow:
+                queues.discard(q)
+                while not q.empty():
+                    q.get_nowait()
+                q.put_nowait(_CLOSE)
+            if not queues:
+                del self._subscriptions[session_id]
+
+    async def _realtime_channel(self, session_id: str):
+        """Joins 'session_{session_id}' once; later messages reuse the joined channel."""
+        if self._realtime_client is None:
+            key = SUPABASE_SERVICE_ROLE_KEY or SUPABASE_KEY
+            self._realtime_client = AsyncRealtimeClient(f"{SUPABASE_URL.rstrip('/')}/realtime/v1", key, auto_reconnect=True)
+
+        client = self._realtime_client
+        channel = client.channel(f"session_{session_id}")
+        joined = asyncio.get_running_loop().create_future()
+
+        def on_state(state, err):
+            if not joined.done():
+                joined.set_result(state == RealtimeSubscribeStates.SUBSCRIBED)
+
+        async def join():
+            await channel.subscribe(on_state)
+            if not await joined:
+                raise RuntimeError(f"could not join session_{session_id}")
+            return channel
+
+        try:
+            return await asyncio.wait_for(join(), REALTIME_JOIN_TIMEOUT)
+        except BaseException:
+            # Don't leave the failed channel registered on the shared socket
+            client.channels.pop(channel.topic, None)
+            raise
+
+    async def _realtime_send(self, session_id: str, message: str, type: str):
+        loop = asyncio.get_running_loop()
+        # Concurrent first messages for a session share one join
+        join = self._realtime_channels.get(session_id)
+        if join is None:
+            if loop.time() < self._realtime_retry_at.get(session_id, 0):
+                return
+            join = self._realtime_channels[session_id] = asyncio.ensure_future(self._realtime_channel(session_id))
+        try:
+            channel = await join
+        except Exception as e:
+            # Only this session falls back to local SSE, and only until the backoff passes
+            if self._realtime_channels.get(session_id) is join:
+                del self._realtime_channels[session_id]
+                now = loop.time()
+                self._realtime_retry_at = {s: t for s, t in self._realtime_retry_at.items() if t > now}
+                self._realtime_retry_at[session_id] = now + REALTIME_RETRY_BACKOFF
+                logger.warning(f"Realtime broadcast unavailable for session {session_id}, retrying in {REALTIME_RETRY_BACKOFF}s: {e!r}")
+            return
+        self._realtime_retry_at.pop(session_id, None)
+
         try:
-            # Note: channel.send is a broadcast.
-            # Channel name: 'session_{session_id}'
-            # Event: 'log'
-            # Payload: { 'message': message, 'type': type }
-            # Accessing the private client implementation details might be risky,
-            # but usually Supabase client enables: client.channel(...).send(...)
-            # If the sync client doesn't support async, we might need to be careful.
-            
-            # Since proper Realtime via python SDK is often async/stateful (websockets),
-            # strictly 'firing' a message statelessly is tricky.
-            # Using table insert as a fallback for 'logs' if we can't broadcast easily?
-            # Or use 'track' presence?
-            
-            # Let's try to update a lightweight 'session_state' row in 'chat_sessions'
-            # OR we can assume the frontend will poll or we rely on LogStreamManager
-            # if we are NOT actually in the cloud yet.
-            
-            # User requirement: "status ... isn't coming in automatically"
-            # If Cloud Worker is running, it MUST communicate back.
-            # Best way without complex Realtime setup: Save a 'system_log' message to DB?
-            # No, that clutters history.
-            
-            # Actually, just inserting into 'logs' table (if it existed) would work.
-            # But let's assume we can use the 'status' update on the Profile (research_status)
-            # which we are ALREADY doing in agent_runner (status=SEARCHING, status=COMPLETED).
-            # The User said "status... only showing after i refresh".
-            # This means the frontend is NOT listening to 'profile' changes.
-            pass 
+            await channel.send_broadcast("log", {"message": message, "type": type})
         except Exception as e:
-            print(f"Broadcast Error: {e}")
+            logger.warning(f"Broadcast Error: {e}")
+
+        if self._realtime_channels.get(session_id) is not join:
+            return
+        idle = self._realtime_idle.pop(session_id, None)
+        if idle is not None:
+            idle.cancel()
+        if type in ("complete", "error"):
+            # Terminal events end the session's stream; release its channel
+            await self._release_channel(session_id, join)
+        else:
+            # Sessions that end any other way (cancel, crash, chat-only logs) are released once idle
+            self._realtime_idle[session_id] = loop.call_later(
+                REALTIME_CHANNEL_IDLE, lambda: self._spawn_realtime(self._release_channel(session_id, join))
+            )
+
+    def _spawn_realtime(self, coro):
+        task = asyncio.create_task(coro)
+        self._realtime_tasks.add(task)
+        task.add_done_callback(self._realtime_tasks.discard)
+
+    async def _release_channel(self, session_id: str, join: asyncio.Future):
+        """Leaves a session's channel, unless it has already been replaced or released."""
+        if self._realtime_channels.get(session_id) is not join:
+            return
+        del self._realtime_channels[session_id]
+        idle = self._realtime_idle.pop(session_id, None)
+        if idle is not None:
+            idle.cancel()
+        channel = join.result()
+        try:
+            await channel.unsubscribe()
+        except Exception:
+            pass
+        if self._realtime_client is not None:
+            self._realtime_client.channels.pop(channel.topic, None)
+
+    async def aclose(self):
+        """Closes the Realtime socket (app shutdown)."""
+        for idle in self._realtime_idle.values():
+            idle.cancel()
+        self._realtime_idle.clear()
+        if self._realtime_tasks:
+            await asyncio.gather(*self._realtime_tasks, return_exceptions=True)
+        self._realtime_channels.clear()
+        await self._close_realtime_client()
+
+    async def _close_realtime_client(self):
+        client, self._realtime_client = self._realtime_client, None
+        if client is not None:
+            try:
+                await client.close()
+            except Exception:
+                pass
 
 # Singleton Instance
 log_stream_manager = LogStreamManager()
@@ -1,5 +1,10 @@
 import os
-from supabase import create_client, Client
+import queue
+import atexit
+import httpx
+import orjson
+import logging
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,37 +13,156 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY") # Legacy Fallback
 BUCKET_NAME = "resumes"
-
+RESUME_EXTENSIONS = ('.pdf', '.docx', '.doc')
+# Lead fields the jobs/matches views use; skips user_id/resume_filename and any wide extra columns
+LEAD_LIST_COLUMNS = "id, title, company, url, status, match_score, match_reason, query_source, created_at"
+LEADS_INSERT_BATCH_SIZE = 500 # rows per INSERT, keeps each request under PostgREST payload/timeout limits
+_URL_PATH_SAFE = "/!$&'()*+,;=:@" # RFC 3986 path characters left unescaped, as storage3's URL builder does
+CHAT_QUEUE_MAX = 10000 # pending chat messages before save_chat_message blocks
+CHAT_ENQUEUE_TIMEOUT = 10 # seconds save_chat_message waits for room in a full queue before dropping the message
+CHAT_WRITE_BATCH = 100 # max messages per INSERT from the background writer
+CHAT_FLUSH_TIMEOUT = 10 # seconds a history read waits for its session's queued messages
+
+import re
 import time
+from collections import Counter
+from urllib.parse import quote
 
 from functools import lru_cache
+from postgrest.exceptions import APIError
+from postgrest.types import CountMethod, ReturnMethod
+from app.services.io_pool import IO_POOL_MAX_WORKERS, leads_write_pool
+
+logger = logging.getLogger(__name__)
+
+_UNSET = object()
 
 class SupabaseService:
     def __init__(self):
-        key = SUPABASE_SERVICE_ROLE_KEY or SUPABASE_KEY
-        if not SUPABASE_URL or not key:
-            print("⚠️ Warning: SUPABASE_URL or SUPABASE_SERVICE_ROLE_KEY not found in .env")
-            self.client = None
-        else:
-            # Passing SUPABASE_URL as-is to avoid "Storage endpoint URL should have a trailing slash" warning
-            # Use Service Role Key for Backend -> Bypasses RLS for admin tasks
-            self.client: Client = create_client(SUPABASE_URL, key)
+        # The supabase client is built on first use, not at import (see the `client` property)
+        self._client = _UNSET
+        self._client_lock = threading.Lock()
+
+        self._bucket_verified = False
+
+        # Reusable table/bucket handles, rebuilt if self.client is swapped (e.g. tests)
+        self._handles = {}
+        self._handles_client = None
+
+        # Public object URLs are a constant prefix + path; no need for a storage client per file
+        self._public_base = f"{(SUPABASE_URL or '').rstrip('/')}/storage/v1/object/public/{BUCKET_NAME}"
         
-        # Cache: Key = f"{user_id}_{resume_filename}" -> Value = (List[Dict], timestamp)
+        # Cache: Key = f"{user_id}_{resume_filename}_{page}_{limit}_{after}" -> Value = (result, timestamp)
         self.leads_cache = {}
         self.LEADS_CACHE_TTL = 60 # seconds
+        self.LEADS_CACHE_MAX = 1024 # entries; oldest are evicted first (dicts keep insertion order)
+        self._leads_cache_lock = threading.Lock()
+        # f"{user_id}_{resume_filename}" -> cached page keys, so invalidation skips a full scan
+        self._leads_cache_index = {}
+
+        # Short-lived lookups repeated within seconds (auth checks, applier logins):
+        # email -> (value, timestamp)
+        self._user_cache = {}
+        self._creds_cache = {}
+        self.LOOKUP_CACHE_TTL = 30 # seconds
+        self.LOOKUP_CACHE_MAX = 512
+        self._lookup_lock = threading.Lock()
+
+        # Chat messages are written by one background thread (started on first save), in order
+        self._chat_queue = queue.Queue(maxsize=CHAT_QUEUE_MAX)
+        self._chat_writer = None
+        self._chat_writer_lock = threading.Lock()
+        # session_id -> queued-but-unwritten message count, so reads wait only for their own session
+        self._chat_pending = {}
+        self._chat_pending_cond = threading.Condition()
+
+    @property
+    def client(self):
+        if self._client is _UNSET:
+            with self._client_lock:
+                if self._client is _UNSET:
+                    self._client = self._create_client()
+        return self._client
+
+    @client.setter
+    def client(self, value):
+        self._client = value
+
+    @staticmethod
+    def _create_client():
+        key = SUPABASE_SERVICE_ROLE_KEY or SUPABASE_KEY
+        if not SUPABASE_URL or not key:
+            logger.warning("SUPABASE_URL or SUPABASE_SERVICE_ROLE_KEY not found in .env")
+            return None
+
+        from supabase import create_client
+        from supabase.lib.client_options import SyncClientOptions
+
+        # One keep-alive pool shared by PostgREST, Storage and Auth; sized to the io_pool threads
+        http = httpx.Client(
+            limits=httpx.Limits(max_connections=IO_POOL_MAX_WORKERS, max_keepalive_connections=40, keepalive_expiry=60),
+            timeout=httpx.Timeout(60.0, connect=5.0),
+            follow_redirects=True,
+            http2=True
+        )
+        logger.info("Supabase HTTP pool: max_connections=%s, keepalive=40", IO_POOL_MAX_WORKERS)
+
+        # Passing SUPABASE_URL as-is to avoid "Storage endpoint URL should have a trailing slash" warning
+        # Use Service Role Key for Backend -> Bypasses RLS for admin tasks
+        return create_client(SUPABASE_URL, key, options=SyncClientOptions(httpx_client=http))
+
+    def _handle(self, key: str, factory):
+        if self._handles_client is not self.client:
+            self._handles = {}
+            self._handles_client = self.client
+        handle = self._handles.get(key)
+        if handle is None:
+            handle = self._handles[key] = factory()
+        return handle
+
+    def _table(self, name: str):
+        """Cached request builder for a table; each .select()/.insert() on it starts a fresh query."""
+        return self._handle(name, lambda: self.client.table(name))
+
+    def _bucket(self):
+        """Cached storage proxy for the resumes bucket."""
+        return self._handle(f"storage:{BUCKET_NAME}", lambda: self.client.storage.from_(BUCKET_NAME))
+
+    def _lookup_get(self, cache: dict, key):
+        with self._lookup_lock:
+            cached = cache.get(key)
+            if cached and time.time() - cached[1] < self.LOOKUP_CACHE_TTL:
+                return cached[0]
+            cache.pop(key, None)
+            return None
+
+    def _lookup_put(self, cache: dict, key, value):
+        with self._lookup_lock:
+            cache.pop(key, None)
+            cache[key] = (value, time.time())
+            while len(cache) > self.LOOKUP_CACHE_MAX:
+                del cache[next(iter(cache))]
+
+    def _drop_leads_cache_entry(self, key: str):
+        # Caller holds _leads_cache_lock. Page keys end in "_{page}_{limit}_{after}", none containing "_"
+        self.leads_cache.pop(key, None)
+        group = key.rsplit("_", 3)[0]
+        keys = self._leads_cache_index.get(group)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._leads_cache_index[group]
 
     def invalidate_leads_cache(self, user_id: int, resume_filename: str):
         """
         Manually validates the leads cache for a specific user/resume.
         """
         cache_key = f"{user_id}_{resume_filename}"
-        if cache_key in self.leads_cache:
-            # Naive invalidation: remove all keys starting with prefix
-            keys_to_remove = [k for k in self.leads_cache if k.startswith(cache_key)]
-            for k in keys_to_remove:
-                del self.leads_cache[k]
-            print(f"🧹 Invalidated {len(keys_to_remove)} cache entries for {cache_key}")
+        # Entries are keyed per page ("{user_id}_{resume_filename}_{page}_{limit}_{after}"): remove them all
+        with self._leads_cache_lock:
+            keys_to_remove = [k for k in self._leads_cache_index.pop(cache_key, ()) if self.leads_cache.pop(k, None) is not None]
+        if keys_to_remove:
+            logger.info("Invalidated %s cache entries for %s", len(keys_to_remove), cache_key)
 
     def upload_resume(self, file_content: bytes, file_name: str, user_id: int, content_type: str = "application/pdf") -> str:
         """
@@ -49,42 +173,44 @@ class SupabaseService:
              raise Exception("Supabase client not initialized")
 
         path = f"{user_id}/{file_name}"
+        self._ensure_bucket()
 
         try:
-            # Attempt upload
-            self.client.storage.from_(BUCKET_NAME).upload(
+            self._bucket().upload(
                 path=path,
                 file=file_content,
                 file_options={"content-type": content_type, "upsert": "true"}
             )
 
-            public_url = self.client.storage.from_(BUCKET_NAME).get_public_url(path)
-            return public_url
+            return self.public_url(path)
 
         except Exception as e:
-            # Check for "Bucket not found" error string
-            error_str = str(e)
-            if "Bucket not found" in error_str or "404" in error_str:
-                print(f"⚠️ Bucket '{BUCKET_NAME}' not found. Attempting to create...")
-                try:
-                    self.client.storage.create_bucket(BUCKET_NAME, options={"public": True})
-                    print(f"✅ Bucket '{BUCKET_NAME}' created successfully.")
-
-                    # Retry upload
-                    self.client.storage.from_(BUCKET_NAME).upload(
-                        path=path,
-                        file=file_content,
-                        file_options={"content-type": content_type, "upsert": "true"}
-                    )
-                    public_url = self.client.storage.from_(BUCKET_NAME).get_public_url(path)
-                    return public_url
-                except Exception as create_error:
-                    print(f"❌ Failed to create/upload to bucket: {create_error}")
-                    raise e
-
-            print(f"❌ Supabase Upload Error: {e}")
+            logger.exception("Supabase Upload Error", extra={"path": path})
             raise e
 
+    def _ensure_bucket(self):
+        """
+        Creates the resumes bucket once per process (an "already exists" error is fine),
+        so uploads are a single request afterwards. Other failures (network, permissions)
+        are retried on the next upload.
+        """
+        if self._bucket_verified:
+            return
+        try:
+            self.client.storage.create_bucket(BUCKET_NAME, options={"public": True})
+            logger.info("Bucket '%s' created successfully.", BUCKET_NAME)
+        except Exception as e:
+            if "exist" not in str(e).lower():
+                logger.warning("Could not create bucket '%s': %s", BUCKET_NAME, e)
+                return
+        self._bucket_verified = True
+
+    def public_url(self, path: str) -> str:
+        """
+        Public URL of an object in the resumes bucket (same as storage get_public_url).
+        """
+        return f"{self._public_base}/{quote(path, safe=_URL_PATH_SAFE)}"
+
     def upload_file(self, file_content: bytes, file_name: str, user_id: int, content_type: str = "application/octet-stream") -> str:
         """
         Generic wrapper for uploading files to the user's folder.
@@ -100,43 +226,44 @@ class SupabaseService:
 
         try:
             # List files in the folder "user_id/"
-            files = self.client.storage.from_(BUCKET_NAME).list(path=f"{user_id}")
+            files = self._bucket().list(path=f"{user_id}")
 
-            result = []
-            for f in files:
-                if f['name'] == '.emptyFolderPlaceholder': continue # Skip system files
-                
-                # Filter for actual resume documents
-                lower_name = f['name'].lower()
-                if not (lower_name.endswith('.pdf') or lower_name.endswith('.docx') or lower_name.endswith('.doc')):
-                    continue
-                result.append({
+            # Only actual resume documents (this also skips system files like .emptyFolderPlaceholder)
+            folder_url = f"{self._public_base}/{user_id}/"
+            return [
+                {
                     "name": f['name'],
                     "id": f['id'],
                     "created_at": f.get('created_at'),
                     "metadata": f.get('metadata'),
-                    "url": self.client.storage.from_(BUCKET_NAME).get_public_url(f"{user_id}/{f['name']}")
-                })
-            return result
+                    "url": folder_url + quote(f['name'], safe=_URL_PATH_SAFE)
+                }
+                for f in files
+                if f['name'].lower().endswith(RESUME_EXTENSIONS)
+            ]
         except Exception as e:
-            print(f"❌ Supabase List Error: {e}")
+            logger.exception("Supabase List Error")
             return []
 
-    @lru_cache(maxsize=128)
     def get_credentials(self, email: str):
         """
         Fetches credentials for a specific email from the 'credentials' table.
-        Cached.
+        Cached for LOOKUP_CACHE_TTL seconds; save_credential refreshes it.
         """
         if not self.client:
-            print("⚠️ Supabase client not initialized.")
+            logger.warning("Supabase client not initialized.")
             return []
 
+        cached = self._lookup_get(self._creds_cache, email)
+        if cached is not None:
+            return cached
+
         try:
-            response = self.client.table("credentials").select("*").eq("email", email).execute()
+            response = self._table("credentials").select("*").eq("email", email).execute()
+            self._lookup_put(self._creds_cache, email, response.data)
             return response.data
         except Exception as e:
-            print(f"❌ Supabase Credential Fetch Error: {e}")
+            logger.exception("Supabase Credential Fetch Error")
             return []
 
     def save_credential(self, domain: str, email: str, password: str, user_id: int = None):
@@ -144,7 +271,7 @@ class SupabaseService:
         Saves or updates a credential in the 'credentials' table.
         """
         if not self.client:
-             print("⚠️ Supabase client not initialized.")
+             logger.warning("Supabase client not initialized.")
              return
 
         try:
@@ -155,27 +282,35 @@ class SupabaseService:
                 "user_id": user_id
             }
             # Upsert on email/domain
-            self.client.table("credentials").upsert(data, on_conflict="email, domain").execute()
-            print(f"✅ Saved credential for {domain} to DB.")
+            self._table("credentials").upsert(data, on_conflict="email, domain").execute()
+            with self._lookup_lock:
+                self._creds_cache.pop(email, None)
+            logger.info("Saved credential for %s to DB.", domain)
         except Exception as e:
-            print(f"❌ Supabase Credential Save Error: {e}")
+            logger.exception("Supabase Credential Save Error")
 
     # --- User Management ---
     def get_user_by_email(self, email: str):
         """
         Fetches a user by email from the 'users' table.
         Only fetches auth fields: id, email, password_hash, created_at
+        Found users are cached for LOOKUP_CACHE_TTL seconds (misses are not, so a new signup is seen at once).
         """
         if not self.client:
             return None
 
+        cached = self._lookup_get(self._user_cache, email)
+        if cached is not None:
+            return cached
+
         try:
-            response = self.client.table("users").select("id, email, password_hash, created_at").eq("email", email).execute()
+            response = self._table("users").select("id, email, password_hash, created_at").eq("email", email).execute()
             if response.data:
+                self._lookup_put(self._user_cache, email, response.data[0])
                 return response.data[0]
             return None
         except Exception as e:
-            print(f"❌ Supabase User Fetch Error: {e}")
+            logger.exception("Supabase User Fetch Error")
             return None
 
     @lru_cache(maxsize=128)
@@ -187,18 +322,19 @@ class SupabaseService:
         if not self.client:
             return None
         try:
-            response = self.client.table("profiles").select("*").eq("user_id", user_id).execute()
+            response = self._table("profiles").select("*").eq("user_id", user_id).execute()
             if response.data:
                 return response.data[0]
             # Fallback if profile missing (shouldn't happen with trigger)
             return None 
         except Exception as e:
-            print(f"❌ Supabase Profile Fetch Error: {e}")
+            logger.exception("Supabase Profile Fetch Error")
             return None
 
     def create_user(self, email: str, password_hash: str, full_name: str = None):
         """
         Creates a new user in the 'users' table.
+        Returns None if the email is already registered (checked by the DB in the same request).
         The DB Trigger 'on_auth_user_created' will auto-create the 'profiles' row.
         If full_name is provided, we update the profile immediately after.
         """
@@ -206,12 +342,20 @@ class SupabaseService:
             raise Exception("Supabase client not initialized")
 
         try:
-            # 1. Insert into Users (Auth only)
+            # 1. Insert into Users (Auth only); ON CONFLICT DO NOTHING returns no row for an existing email
             data = {
                 "email": email,
                 "password_hash": password_hash
             }
-            response = self.client.table("users").insert(data).execute()
+            try:
+                response = self._table("users").upsert(data, on_conflict="email", ignore_duplicates=True).execute()
+            except APIError as e:
+                if e.code != "42P10":
+                    raise
+                # No unique index on users.email yet: check first, then plain insert
+                if self.get_user_by_email(email):
+                    return None
+                response = self._table("users").insert(data).execute()
             
             if response.data:
                 user = response.data[0]
@@ -223,12 +367,12 @@ class SupabaseService:
                         self.update_user_profile(user_id, {"full_name": full_name})
                         user['full_name'] = full_name # Return composite object for immediate UI use
                     except Exception as pe:
-                        print(f"⚠️ Failed to update profile name: {pe}")
+                        logger.warning("Failed to update profile name: %s", pe)
                 
                 return user
             return None
         except Exception as e:
-            print(f"❌ Supabase User Create Error: {e}")
+            logger.exception("Supabase User Create Error")
             raise e
 
     def clear_user_cache(self, user_id: int):
@@ -236,7 +380,8 @@ class SupabaseService:
         Clears the LRU cache for user profile and credentials (best effort).
         """
         self.get_user_profile.cache_clear()
-        self.get_credentials.cache_clear()
+        with self._lookup_lock:
+            self._creds_cache.clear()
 
     def update_user_profile(self, user_id: int, data: dict):
         """
@@ -247,14 +392,14 @@ class SupabaseService:
 
         try:
             # ensure data only contains profile fields
-            response = self.client.table("profiles").update(data).eq("user_id", user_id).execute()
+            response = self._table("profiles").update(data).eq("user_id", user_id).execute()
             if response.data:
                 # Clear cache on update
                 self.clear_user_cache(user_id)
                 return response.data[0]
             return None
         except Exception as e:
-            print(f"❌ Supabase User Update Error: {e}")
+            logger.exception("Supabase User Update Error")
             raise e
 
     def get_research_status(self, user_id: int):
@@ -265,12 +410,12 @@ class SupabaseService:
             return {}
 
         try:
-            response = self.client.table("profiles").select("profile_data").eq("user_id", user_id).execute()
+            response = self._table("profiles").select("profile_data").eq("user_id", user_id).execute()
             if response.data:
                 return response.data[0].get('profile_data', {})
             return {}
         except Exception as e:
-            print(f"❌ Supabase Status Fetch Error: {e}")
+            logger.exception("Supabase Status Fetch Error")
             return {}
 
     def download_file(self, path: str) -> bytes:
@@ -281,11 +426,32 @@ class SupabaseService:
             raise Exception("Supabase client not initialized")
 
         try:
-            response = self.client.storage.from_(BUCKET_NAME).download(path)
+            response = self._bucket().download(path)
             # response is bytes directly in some versions, or needs .read()
             return response
         except Exception as e:
-            print(f"❌ Supabase Download Error: {e}")
+            logger.exception("Supabase Download Error", extra={"path": path})
+            raise e
+
+    def download_file_to(self, path: str, dest_path: str, chunk_size: int = 64 * 1024):
+        """
+        Streams a file from the bucket straight to dest_path in chunks,
+        without holding the whole object in memory.
+        """
+        if not self.client:
+            raise Exception("Supabase client not initialized")
+
+        try:
+            # storage3 only exposes a buffered download(); stream the same object endpoint with its client/headers
+            bucket = self._bucket()
+            url = bucket._base_url.joinpath("object", bucket.id, *path.split("/"))
+            with bucket._client.stream("GET", str(url), headers=bucket._headers) as response:
+                response.raise_for_status()
+                with open(dest_path, "wb") as f:
+                    for chunk in response.iter_bytes(chunk_size):
+                        f.write(chunk)
+        except Exception as e:
+            logger.exception("Supabase Download Error", extra={"path": path})
             raise e
 
     def delete_file(self, path: str):
@@ -296,12 +462,35 @@ class SupabaseService:
              raise Exception("Supabase client not initialized")
 
         try:
-            self.client.storage.from_(BUCKET_NAME).remove([path])
+            self._bucket().remove([path])
             return True
         except Exception as e:
-             print(f"❌ Supabase Delete Error: {e}")
+             logger.exception("Supabase Delete Error", extra={"path": path})
              raise e
 
+    # --- Parsed Resume Cache ---
+    def get_cached_resume_parse(self, digest: str):
+        """
+        Returns the parsed-resume JSON string stored for this SHA-256 of the PDF bytes, or None.
+        """
+        if not self.client: return None
+        try:
+            response = self._table("resume_cache").select("parsed").eq("hash", digest).limit(1).execute()
+            return response.data[0]["parsed"] if response.data else None
+        except Exception as e:
+            logger.warning("Resume Cache Read Error: %s", e)
+            return None
+
+    def cache_resume_parse(self, digest: str, parsed: str):
+        """
+        Stores a parsed-resume JSON string under the SHA-256 of the PDF bytes.
+        """
+        if not self.client: return
+        try:
+            self._table("resume_cache").upsert({"hash": digest, "parsed": parsed}).execute()
+        except Exception as e:
+            logger.warning("Resume Cache Write Error: %s", e)
+
     # --- Leads / Jobs Management ---
     def get_lead_counts(self, user_id: int) -> dict:
         """
@@ -311,26 +500,34 @@ class SupabaseService:
             return {}
 
         try:
-            # Fetch all resume_filenames for this user
-            response = self.client.table("leads")\
+            try:
+                # GROUP BY runs in Postgres: one row per resume comes back
+                response = self.client.rpc("count_leads_by_resume", {"p_user_id": user_id}).execute()
+                return {row['resume_filename']: row['cnt'] for row in response.data}
+            except APIError as e:
+                if e.code != "PGRST202":
+                    raise
+
+            # RPC not deployed yet: fetch all resume_filenames for this user and count here
+            response = self._table("leads")\
                 .select("resume_filename")\
                 .eq("user_id", user_id)\
                 .execute()
 
-            from collections import Counter
             counts = Counter(row['resume_filename'] for row in response.data)
             return dict(counts)
         except Exception as e:
-            print(f"❌ Supabase Lead Count Error: {e}")
+            logger.exception("Supabase Lead Count Error", extra={"user_id": user_id})
             return {}
 
     def save_leads_bulk(self, user_id: int, resume_filename: str, leads: list):
         """
         Inserts multiple leads into the 'leads' table.
         leads: list of dicts with keys (title, company, url, match_score, match_reason, query_source)
+        Returns the number of newly inserted leads (URLs already saved for this resume are skipped).
         """
         if not self.client:
-             print("⚠️ Supabase client not initialized.")
+             logger.warning("Supabase client not initialized.")
              return
 
         if not leads:
@@ -352,44 +549,60 @@ class SupabaseService:
             })
 
         try:
-            # Application-side deduplication to ensure cumulative add without overwriting
-            # 1. Fetch existing URLs for this user/resume
-            existing_res = self.client.table("leads")\
-                .select("url")\
-                .eq("user_id", user_id)\
-                .eq("resume_filename", resume_filename)\
-                .execute()
-
-            existing_urls = {row['url'] for row in existing_res.data} if existing_res.data else set()
-
-            # 2. Filter out duplicates
-            new_records = []
-            for lead in leads:
-                if lead.get("url") not in existing_urls:
-                    new_records.append({
-                        "user_id": user_id,
-                        "resume_filename": resume_filename,
-                        "title": lead.get("title"),
-                        "company": lead.get("company"),
-                        "url": lead.get("url"),
-                        "match_score": lead.get("match_score"),
-                        "match_reason": lead.get("match_reason"),
-                        "query_source": lead.get("query_source"),
-                        "status": "NEW",
-                        # "created_at": "now()" # Supabase defaults this usually
-                    })
-
-            if new_records:
-                self.client.table("leads").insert(new_records).execute()
-                print(f"✅ Saved {len(new_records)} new leads to DB (skipped {len(leads) - len(new_records)} duplicates).")
+            # Cumulative add without overwriting: the DB skips URLs already saved for this user/resume
+            # (unique index leads_user_resume_url, see supabase/migrations)
+            try:
+                saved = self._write_leads(records, self._upsert_leads_chunk)
+            except APIError as e:
+                if e.code != "42P10":
+                    raise
+                # Unique index not created yet: fall back to application-side deduplication
+                existing_res = self._table("leads")\
+                    .select("url")\
+                    .eq("user_id", user_id)\
+                    .eq("resume_filename", resume_filename)\
+                    .execute()
+                existing_urls = {row['url'] for row in existing_res.data} if existing_res.data else set()
+                saved = self._write_leads([r for r in records if r["url"] not in existing_urls], self._insert_leads_chunk)
+
+            if saved:
+                logger.info("Saved %s new leads to DB (skipped %s duplicates).", saved, len(leads) - saved)
                 
                 # Invalidate Cache
                 self.invalidate_leads_cache(user_id, resume_filename)
             else:
-                 print("ℹ️ No new leads to save (all duplicates).")
+                 logger.info("No new leads to save (all duplicates).")
+            return saved
 
         except Exception as e:
-             print(f"❌ Supabase Leads Save Error: {e}")
+             logger.exception("Supabase Leads Save Error", extra={"user_id": user_id, "resume_filename": resume_filename})
+
+    def _write_leads(self, records: list, write_chunk) -> int:
+        """
+        Writes records in LEADS_INSERT_BATCH_SIZE chunks; returns how many rows were inserted.
+        Chunks are sent concurrently on leads_write_pool, never io_pool: callers already run
+        this on io_pool (run_io), and waiting on io_pool work from inside io_pool can deadlock it.
+        """
+        chunks = [records[i:i + LEADS_INSERT_BATCH_SIZE] for i in range(0, len(records), LEADS_INSERT_BATCH_SIZE)]
+        if len(chunks) <= 1:
+            return sum(write_chunk(chunk) for chunk in chunks)
+        return sum(leads_write_pool.map(write_chunk, chunks))
+
+    def _upsert_leads_chunk(self, chunk: list) -> int:
+        # ON CONFLICT DO NOTHING; return=minimal + count=exact: the server reports how many rows
+        # were inserted (Content-Range) instead of shipping them back
+        response = self._table("leads").upsert(
+            chunk,
+            on_conflict="user_id,resume_filename,url",
+            ignore_duplicates=True,
+            returning=ReturnMethod.minimal,
+            count=CountMethod.exact
+        ).execute()
+        return response.count if response.count is not None else len(chunk)
+
+    def _insert_leads_chunk(self, chunk: list) -> int:
+        response = self._table("leads").insert(chunk, returning=ReturnMethod.minimal, count=CountMethod.exact).execute()
+        return response.count if response.count is not None else len(chunk)
 
     def get_lead_by_title(self, user_id: int, input_text: str):
         """
@@ -399,7 +612,7 @@ class SupabaseService:
 
         # Helper to execute query
         def _search(title_query, company_query=None):
-            q = self.client.table("leads").select("*").eq("user_id", user_id)
+            q = self._table("leads").select("*").eq("user_id", user_id)
             q = q.ilike("title", f"%{title_query}%")
             if company_query:
                 q = q.ilike("company", f"%{company_query}%")
@@ -407,7 +620,6 @@ class SupabaseService:
 
         try:
             # 1. Try separating " at " (e.g. "Software Engineer at Google")
-            import re
             # Split on " at " case-insensitive
             parts = re.split(r'\s+at\s+', input_text, flags=re.IGNORECASE)
             
@@ -417,31 +629,31 @@ class SupabaseService:
                 candidate_company = parts[-1].strip()
                 candidate_title = " at ".join(parts[:-1]).strip()
                 
-                print(f"🕵️‍♀️ Strict Search -> Title: '{candidate_title}' | Company: '{candidate_company}'")
+                logger.info("Strict Search -> Title: '%s' | Company: '%s'", candidate_title, candidate_company)
 
                 # Attempt 1: Match Title AND Company
                 res = _search(candidate_title, candidate_company)
                 if res.data: 
-                    print(f"✅ Strict Match Found: {res.data[0]['title']} @ {res.data[0]['company']}")
+                    logger.info("Strict Match Found: %s @ %s", res.data[0]['title'], res.data[0]['company'])
                     return res.data[0]
                 else:
-                    print("❌ Strict Match Failed.")
+                    logger.info("Strict Match Failed.")
 
                 # DANGEROUS FALLBACK REMOVED: Do NOT search just by title if user specified company.
                 # It causes false positives (e.g. finding 'Dev at Google' when asking for 'Dev at Facebook')
 
             # Scenario B: Search full string in Title column
             # Useful if "at" wasn't a separator, or if the user typed the Company in the Title field manually?
-            print(f"🕵️‍♀️ Fallback Search (Full String) -> Title: '{input_text}'")
+            logger.info("Fallback Search (Full String) -> Title: '%s'", input_text)
             res = _search(input_text)
             if res.data: 
-                print(f"✅ Fallback Match Found: {res.data[0]['title']}")
+                logger.info("Fallback Match Found: %s", res.data[0]['title'])
                 return res.data[0]
 
             return None
 
         except Exception as e:
-            print(f"❌ Supabase Lead Fetch by Title Error: {e}")
+            logger.exception("Supabase Lead Fetch by Title Error")
             return None
 
     def get_lead_by_url(self, user_id: int, url: str):
@@ -452,7 +664,7 @@ class SupabaseService:
             return None
 
         try:
-            response = self.client.table("leads")\
+            response = self._table("leads")\
                 .select("*")\
                 .eq("user_id", user_id)\
                 .eq("url", url)\
@@ -462,69 +674,134 @@ class SupabaseService:
                 return response.data[0]
             return None
         except Exception as e:
-            print(f"❌ Supabase Lead Fetch Error: {e}")
+            logger.exception("Supabase Lead Fetch Error")
             return None
 
     def update_lead_status_by_url(self, user_id: int, url: str, status: str, resume_filename: str = None):
         """
         Updates the status of a lead by URL (e.g. to 'APPLIED').
+        The updated rows come back in the same response, so the leads cache is invalidated
+        for every resume they belong to; resume_filename is only an extra key to invalidate.
         """
         if not self.client:
-             print("⚠️ Supabase client not initialized.")
+             logger.warning("Supabase client not initialized.")
              return
 
         try:
-            self.client.table("leads")\
-                .update({"status": status})\
+            response = self._table("leads")\
+                .update({"status": status}, returning=ReturnMethod.representation)\
                 .eq("user_id", user_id)\
                 .eq("url", url)\
                 .execute()
-            print(f"✅ Updated lead status to '{status}' for {url}")
+            logger.info("Updated lead status to '%s' for %s", status, url)
             
-            # Invalidate Cache if resume_filename provided
-            if resume_filename:
-                self.invalidate_leads_cache(user_id, resume_filename)
+            # Invalidate Cache for the resumes the updated leads belong to
+            resume_filenames = {row.get("resume_filename") for row in response.data or []}
+            resume_filenames.add(resume_filename)
+            for name in resume_filenames - {None}:
+                self.invalidate_leads_cache(user_id, name)
 
         except Exception as e:
-            print(f"❌ Supabase Lead Status Update Error: {e}")
+            logger.exception("Supabase Lead Status Update Error")
 
     def update_lead_status(self, lead_id: int, status: str, user_id: int = None, resume_filename: str = None):
         """
         Updates the status of a lead by ID.
         """
         if not self.client:
-             print("⚠️ Supabase client not initialized.")
+             logger.warning("Supabase client not initialized.")
              return
 
         try:
-            self.client.table("leads")\
+            self._table("leads")\
                 .update({"status": status})\
                 .eq("id", lead_id)\
                 .execute()
-            print(f"✅ Updated lead status to '{status}' for ID {lead_id}")
+            logger.info("Updated lead status to '%s' for ID %s", status, lead_id)
             
             # Invalidate Cache
             if user_id and resume_filename:
                 self.invalidate_leads_cache(user_id, resume_filename)
 
         except Exception as e:
-            print(f"❌ Supabase Lead Status ID Update Error: {e}")
+            logger.exception("Supabase Lead Status ID Update Error")
+
+    def update_lead_statuses_bulk(self, updates: list, user_id: int = None, resume_filename: str = None):
+        """
+        Applies many (lead_id, status) updates with one UPDATE ... WHERE id IN (...) per distinct status.
+        """
+        if not self.client:
+             logger.warning("Supabase client not initialized.")
+             return
+
+        ids_by_status = {}
+        for lead_id, status in updates:
+            ids_by_status.setdefault(status, []).append(lead_id)
+
+        try:
+            for status, ids in ids_by_status.items():
+                self._table("leads")\
+                    .update({"status": status}, returning=ReturnMethod.minimal)\
+                    .in_("id", ids)\
+                    .execute()
+                logger.info("Updated lead status to '%s' for %s leads", status, len(ids))
+
+            # Invalidate Cache (once for the whole batch)
+            if user_id and resume_filename:
+                self.invalidate_leads_cache(user_id, resume_filename)
+
+        except Exception as e:
+            logger.exception("Supabase Bulk Lead Status Update Error")
+
+    def claim_lead_by_url(self, user_id: int, url: str, status: str, resume_filename: str = None):
+        """
+        Finds the user's lead for `url` and sets its status in one round trip
+        (claim_lead_for_apply RPC). Returns the lead id, or None if no lead matches.
+        """
+        if not self.client:
+            return None
+
+        try:
+            try:
+                response = self.client.rpc("claim_lead_for_apply", {
+                    "p_user_id": user_id,
+                    "p_url": url,
+                    "p_status": status
+                }).execute()
+                lead_id = response.data[0]["id"] if response.data else None
+            except APIError as e:
+                if e.code != "PGRST202":
+                    raise
+                # RPC not deployed yet: fall back to fetch + update
+                lead = self.get_lead_by_url(user_id, url)
+                lead_id = lead["id"] if lead else None
+                if lead_id:
+                    self.update_lead_status(lead_id, status)
+
+            if lead_id:
+                logger.info("Updated lead status to '%s' for ID %s", status, lead_id)
+                if resume_filename:
+                    self.invalidate_leads_cache(user_id, resume_filename)
+            return lead_id
+        except Exception as e:
+            logger.exception("Supabase Lead Claim Error")
+            return None
 
     def delete_lead(self, lead_id: int, user_id: int):
         """
         Deletes a lead by ID.
         """
         if not self.client:
-             print("⚠️ Supabase client not initialized.")
+             logger.warning("Supabase client not initialized.")
              return False
 
         try:
-            self.client.table("leads")\
+            self._table("leads")\
                 .delete()\
                 .eq("id", lead_id)\
                 .eq("user_id", user_id)\
                 .execute()
-            print(f"✅ Deleted lead ID {lead_id}")
+            logger.info("Deleted lead ID %s", lead_id)
             
             # Since we don't know the resume context easily here without fetching, 
             # we might want to just clear the cache for this user generally 
@@ -534,71 +811,117 @@ class SupabaseService:
             return True
 
         except Exception as e:
-            print(f"❌ Supabase Lead Delete Error: {e}")
+            logger.exception("Supabase Lead Delete Error")
             return False
 
-    def get_leads(self, user_id: int, resume_filename: str, page: int = 1, limit: int = 10):
+    def get_leads(self, user_id: int, resume_filename: str, page: int = 1, limit: int = 10, after: tuple = None):
         """
         Fetches leads for a specific resume from the 'leads' table with pagination.
-        Returns {"leads": [], "total": 0}
+        If `after` is a (match_score, id) cursor, fetches the page following that lead
+        (keyset pagination on leads_user_resume_score_idx) instead of using `page`;
+        keyset pages skip the exact count, so "total" is None.
+        Returns {"leads": [], "total": 0, "next_after": (score, id) or None}
         """
         if not self.client:
              return {"leads": [], "total": 0}
 
         try:
             # Check Cache
-            cache_key = f"{user_id}_{resume_filename}_{page}_{limit}"
-            if cache_key in self.leads_cache:
-                data, timestamp = self.leads_cache[cache_key]
-                if time.time() - timestamp < self.LEADS_CACHE_TTL:
-                    # print(f"⚡ Cache Hit for leads: {cache_key}")
-                    return data
-                else:
-                    # print(f"⌛ Cache Expired for leads: {cache_key}")
-                    pass
-
-            # Calculate Pagination
-            start = (page - 1) * limit
-            end = start + limit - 1
-
-            # Order by match_score desc, then created_at desc
-            response = self.client.table("leads")\
-                .select("*", count="exact")\
+            cache_key = f"{user_id}_{resume_filename}_{page}_{limit}_{after}"
+            with self._leads_cache_lock:
+                cached = self.leads_cache.get(cache_key)
+                if cached:
+                    data, timestamp = cached[:2]
+                    if time.time() - timestamp < self.LEADS_CACHE_TTL:
+                        return data
+                    # Expired: drop it so stale pages don't pile up
+                    self._drop_leads_cache_entry(cache_key)
+
+            # Order by match_score desc (unscored last), then id desc as a stable tie-break
+            query = self._table("leads")\
+                .select(LEAD_LIST_COLUMNS, count=None if after else "exact")\
                 .eq("user_id", user_id)\
                 .eq("resume_filename", resume_filename)\
-                .order("match_score", desc=True)\
-                .range(start, end)\
-                .execute()
+                .order("match_score", desc=True, nullsfirst=False)\
+                .order("id", desc=True)
+
+            if after:
+                # Keyset: rows strictly after the cursor in (match_score, id) order
+                score, id_ = after
+                if isinstance(score, float) and score.is_integer():
+                    # match_score is an integer column: "85.0" is rejected by Postgres
+                    score = int(score)
+                if score is None:
+                    query = query.is_("match_score", "null").lt("id", id_)
+                else:
+                    query = query.or_(
+                        f"match_score.lt.{score},"
+                        f"and(match_score.eq.{score},id.lt.{id_}),"
+                        f"match_score.is.null"
+                    )
+                response = query.limit(limit).execute()
+            else:
+                # Calculate Pagination
+                start = (page - 1) * limit
+                end = start + limit - 1
+                response = query.range(start, end).execute()
 
+            leads = response.data
             result = {
-                "leads": response.data,
-                "total": response.count
+                "leads": leads,
+                "total": response.count,
+                "next_after": (leads[-1].get("match_score"), leads[-1]["id"]) if len(leads) == limit else None
             }
 
-            # Update Cache
-            self.leads_cache[cache_key] = (result, time.time())
+            # Update Cache (bounded: evict the oldest entries past LEADS_CACHE_MAX)
+            with self._leads_cache_lock:
+                self.leads_cache.pop(cache_key, None)
+                self.leads_cache[cache_key] = (result, time.time())
+                self._leads_cache_index.setdefault(f"{user_id}_{resume_filename}", set()).add(cache_key)
+                while len(self.leads_cache) > self.LEADS_CACHE_MAX:
+                    self._drop_leads_cache_entry(next(iter(self.leads_cache)))
             return result
         except Exception as e:
-            print(f"❌ Supabase Leads Fetch Error: {e}")
+            logger.exception("Supabase Leads Fetch Error")
             return {"leads": [], "total": 0}
 
+    def get_leads_json(self, user_id: int, resume_filename: str, page: int = 1, limit: int = 10, after: tuple = None):
+        """
+        Same page as get_leads, plus its "leads" list serialized to JSON bytes.
+        The bytes are stored with the cached page, so cache hits skip re-encoding.
+        Returns (result, leads_json)
+        """
+        result = self.get_leads(user_id, resume_filename, page=page, limit=limit, after=after)
+        cache_key = f"{user_id}_{resume_filename}_{page}_{limit}_{after}"
+        with self._leads_cache_lock:
+            cached = self.leads_cache.get(cache_key)
+            if cached and cached[0] is result:
+                if len(cached) == 3:
+                    return result, cached[2]
+                leads_json = orjson.dumps(result["leads"])
+                self.leads_cache[cache_key] = (result, cached[1], leads_json)
+                return result, leads_json
+        return result, orjson.dumps(result["leads"])
+
 
     
     # --- Chat Persistence ---
-    def get_pending_leads(self, user_id: int):
+    def get_pending_leads(self, user_id: int, limit: int = 100):
         """
-        Get all leads with status 'NEW' for a user.
+        Get the newest leads with status 'NEW' for a user (capped at `limit`).
         """
         if not self.client: return []
         try:
-            response = self.client.table("leads")\
-                .select("*")\
+            response = self._table("leads")\
+                .select("id, title, company, url, status, created_at")\
                 .eq("user_id", user_id)\
                 .eq("status", "NEW")\
+                .order("created_at", desc=True)\
+                .limit(limit)\
                 .execute()
             return response.data
         except Exception as e:
-            print(f"❌ Supabase Pending Leads Fetch Error: {e}")
+            logger.exception("Supabase Pending Leads Fetch Error")
             return []
 
     def ensure_chat_tables(self):
@@ -623,12 +946,12 @@ class SupabaseService:
         try:
             data = {"user_id": user_id, "title": title}
             # 'chat_sessions' table must exist: id (serial), user_id (int), title (text), created_at (ts)
-            response = self.client.table("chat_sessions").insert(data).execute()
+            response = self._table("chat_sessions").insert(data).execute()
             if response.data:
                 return response.data[0]
             return None
         except Exception as e:
-            print(f"❌ Create Chat Session Error: {e}")
+            logger.exception("Create Chat Session Error")
             return None
 
     def update_chat_session_title(self, session_id: int, title: str):
@@ -637,7 +960,7 @@ class SupabaseService:
         """
         if not self.client: return None
         try:
-            response = self.client.table("chat_sessions")\
+            response = self._table("chat_sessions")\
                 .update({"title": title})\
                 .eq("id", session_id)\
                 .execute()
@@ -645,7 +968,7 @@ class SupabaseService:
                 return response.data[0]
             return None
         except Exception as e:
-            print(f"❌ Update Chat Session Error: {e}")
+            logger.exception("Update Chat Session Error")
             return None
 
     def delete_chat_session(self, session_id: int):
@@ -656,11 +979,15 @@ class SupabaseService:
         If not, we delete messages first manually.
         """
         if not self.client: return False
+        # Messages still queued for the session would be written after it is gone
+        self._drop_queued_chat_messages(session_id)
+        if not self.flush_chat_messages(session_id):
+            logger.warning("Deleting chat session %s with a message write still in flight", session_id)
         try:
             # Manual cascade just in case
-            self.client.table("chat_messages").delete().eq("session_id", session_id).execute()
+            self._table("chat_messages").delete().eq("session_id", session_id).execute()
             
-            response = self.client.table("chat_sessions")\
+            response = self._table("chat_sessions")\
                 .delete()\
                 .eq("id", session_id)\
                 .execute()
@@ -668,7 +995,7 @@ class SupabaseService:
             # response.data usually contains deleted rows
             return True
         except Exception as e:
-            print(f"❌ Delete Chat Session Error: {e}")
+            logger.exception("Delete Chat Session Error")
             return False
 
 
@@ -678,46 +1005,147 @@ class SupabaseService:
         """
         if not self.client: return []
         try:
-            response = self.client.table("chat_sessions")\
+            response = self._table("chat_sessions")\
                 .select("*")\
                 .eq("user_id", user_id)\
                 .order("created_at", desc=True)\
                 .execute()
             return response.data
         except Exception as e:
-            print(f"❌ Get Chat Sessions Error: {e}")
+            logger.exception("Get Chat Sessions Error")
             return []
 
     def save_chat_message(self, session_id: int, role: str, content: str):
         """
         Saves a message to a session.
+        Queued for the background writer, which batches inserts in order; if the queue is full,
+        waits up to CHAT_ENQUEUE_TIMEOUT seconds for room, then drops the message.
         """
         if not self.client: return
+        data = {
+            "session_id": session_id,
+            "role": role,
+            "content": content
+        }
+        self._start_chat_writer()
+        # Counted before it is queued so the writer never sees a message it can't account for
+        with self._chat_pending_cond:
+            self._chat_pending[session_id] = self._chat_pending.get(session_id, 0) + 1
         try:
-            data = {
-                "session_id": session_id,
-                "role": role,
-                "content": content
-            }
-            # 'chat_messages' table: id, session_id, role, content, created_at
-            self.client.table("chat_messages").insert(data).execute()
-        except Exception as e:
-            print(f"❌ Save Chat Message Error: {e}")
+            self._chat_queue.put(data, timeout=CHAT_ENQUEUE_TIMEOUT)
+        except queue.Full:
+            logger.error("Chat writer queue full, dropping message for session %s", session_id)
+            self._release_chat_pending([data])
+
+    def _start_chat_writer(self):
+        if self._chat_writer is not None:
+            return
+        with self._chat_writer_lock:
+            if self._chat_writer is None:
+                self._chat_writer = threading.Thread(target=self._chat_writer_loop, name="chat-writer", daemon=True)
+                self._chat_writer.start()
+                atexit.register(self.flush_chat_messages, timeout=None)
+
+    def _chat_writer_loop(self):
+        while True:
+            # Block for the next message, then take whatever queued up during the last insert
+            batch = [self._chat_queue.get()]
+            while len(batch) < CHAT_WRITE_BATCH:
+                try:
+                    batch.append(self._chat_queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write_chat_batch(batch)
+            self._release_chat_pending(batch)
+
+    def _release_chat_pending(self, messages: list):
+        with self._chat_pending_cond:
+            for message in messages:
+                session_id = message["session_id"]
+                remaining = self._chat_pending.get(session_id, 1) - 1
+                if remaining > 0:
+                    self._chat_pending[session_id] = remaining
+                else:
+                    self._chat_pending.pop(session_id, None)
+            self._chat_pending_cond.notify_all()
+
+    def _drop_queued_chat_messages(self, session_id: int):
+        """Removes a session's not-yet-written messages from the writer queue."""
+        with self._chat_queue.mutex:
+            kept = [m for m in self._chat_queue.queue if m["session_id"] != session_id]
+            dropped = len(self._chat_queue.queue) - len(kept)
+            if dropped:
+                self._chat_queue.queue.clear()
+                self._chat_queue.queue.extend(kept)
+                self._chat_queue.not_full.notify(dropped)
+        if dropped:
+            self._release_chat_pending([{"session_id": session_id}] * dropped)
+
+    def _write_chat_batch(self, batch: list):
+        """
+        Inserts a batch of messages; if it fails, retries each session's messages separately,
+        then row by row, so one bad row (e.g. a deleted session) doesn't lose the rest.
+        """
+        try:
+            self._insert_chat_messages(batch)
+            return
+        except Exception:
+            logger.exception("Save Chat Message Error (batch of %d, retrying per session)", len(batch))
+        by_session = {}
+        for message in batch:
+            by_session.setdefault(message["session_id"], []).append(message)
+        for session_id, messages in by_session.items():
+            try:
+                self._insert_chat_messages(messages)
+                continue
+            except Exception as e:
+                if len(messages) == 1:
+                    logger.error("Save Chat Message Error (session %s): %s", session_id, e)
+                    continue
+            for message in messages:
+                try:
+                    self._insert_chat_messages([message])
+                except Exception as e:
+                    logger.error("Save Chat Message Error (session %s): %s", session_id, e)
+
+    def _insert_chat_messages(self, messages: list):
+        # 'chat_messages' table: id, session_id, role, content, created_at
+        # Rows of one INSERT share created_at; ids keep them in queue order
+        self._table("chat_messages").insert(messages, returning=ReturnMethod.minimal).execute()
+
+    def flush_chat_messages(self, session_id: int = None, timeout: float = CHAT_FLUSH_TIMEOUT):
+        """
+        Blocks until the queued chat messages of `session_id` (all sessions if None) have been
+        written or failed, or until `timeout` seconds pass (None waits indefinitely).
+        Returns True if nothing is left pending.
+        """
+        if self._chat_writer is None:
+            return True
+        if session_id is None:
+            done = lambda: not self._chat_pending
+        else:
+            done = lambda: session_id not in self._chat_pending
+        with self._chat_pending_cond:
+            return self._chat_pending_cond.wait_for(done, timeout)
 
     def get_chat_history(self, session_id: int):
         """
         Get all messages for a session.
         """
         if not self.client: return []
+        # Read-your-writes: wait for this session's messages still in the writer queue
+        if not self.flush_chat_messages(session_id):
+            logger.warning("Chat history for session %s read with messages still queued", session_id)
         try:
-            response = self.client.table("chat_messages")\
+            response = self._table("chat_messages")\
                 .select("*")\
                 .eq("session_id", session_id)\
                 .order("created_at", desc=False)\
+                .order("id", desc=False)\
                 .execute()
             return response.data
         except Exception as e:
-            print(f"❌ Get Chat History Error: {e}")
+            logger.exception("Get Chat History Error")
             return []
 
 # Singleton instance
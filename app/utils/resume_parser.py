@@ -1,7 +1,57 @@
 import os
+import re
+from datetime import datetime
+from fastapi.concurrency import run_in_threadpool
 from google import genai
 from google.genai import types
 
+# Fallback for parser output wrapped in a ```json fence
+JSON_FENCE_RE = re.compile(r"```json\n(.*?)\n```", re.DOTALL)
+
+# Response schema for parse_bytes; built once at import, passed to Gemini on every call
+RESUME_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "full_name": {"type": "STRING"},
+        "email": {"type": "STRING"},
+        "phone": {"type": "STRING"},
+        "linkedin": {"type": "STRING", "description": "LinkedIn profile URL"},
+        "website": {"type": "STRING", "description": "Personal website or portfolio URL"},
+        "location": {"type": "STRING"},
+        "calculated_target_level": {
+            "type": "STRING",
+            "enum": ["Internship", "New Grad", "Junior", "Mid-Level", "Senior"],
+            "description": "Calculated based on graduation date relative to today."
+        },
+        "skills": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "summary": {"type": "STRING"},
+        "work_experience": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "company": {"type": "STRING"},
+                    "title": {"type": "STRING"},
+                    "start_date": {"type": "STRING"},
+                    "end_date": {"type": "STRING", "description": "Use 'Present' if currently employed"},
+                    "description": {"type": "STRING"}
+                }
+            }
+        },
+        "education": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "school": {"type": "STRING"},
+                    "degree": {"type": "STRING"},
+                    "graduation_year": {"type": "STRING"}
+                }
+            }
+        }
+    }
+}
+
 class ResumeParser:
     def __init__(self, api_key):
         self.client = genai.Client(api_key=api_key)
@@ -11,54 +61,16 @@ class ResumeParser:
         with open(pdf_path, "rb") as f:
             pdf_bytes = f.read()
 
+        return await self.parse_bytes(pdf_bytes)
+
+    async def parse_bytes(self, pdf_bytes: bytes):
+        """
+        Parses resume content already in memory (e.g. straight from Storage),
+        skipping the temp-file round trip.
+        """
         # 1.5. Calculate Today's Date for Context
-        from datetime import datetime
         today_str = datetime.now().strftime("%B %d, %Y")
 
-        # 2. Define the Schema (Same as before, but critical for consistency)
-        manual_schema = {
-            "type": "OBJECT",
-            "properties": {
-                "full_name": {"type": "STRING"},
-                "email": {"type": "STRING"},
-                "phone": {"type": "STRING"},
-                "linkedin": {"type": "STRING", "description": "LinkedIn profile URL"},
-                "website": {"type": "STRING", "description": "Personal website or portfolio URL"},
-                "location": {"type": "STRING"},
-                "calculated_target_level": {
-                    "type": "STRING",
-                    "enum": ["Internship", "New Grad", "Junior", "Mid-Level", "Senior"],
-                    "description": "Calculated based on graduation date relative to today."
-                },
-                "skills": {"type": "ARRAY", "items": {"type": "STRING"}},
-                "summary": {"type": "STRING"},
-                "work_experience": {
-                    "type": "ARRAY",
-                    "items": {
-                        "type": "OBJECT",
-                        "properties": {
-                            "company": {"type": "STRING"},
-                            "title": {"type": "STRING"},
-                            "start_date": {"type": "STRING"},
-                            "end_date": {"type": "STRING", "description": "Use 'Present' if currently employed"},
-                            "description": {"type": "STRING"}
-                        }
-                    }
-                },
-                "education": {
-                    "type": "ARRAY",
-                    "items": {
-                        "type": "OBJECT",
-                        "properties": {
-                            "school": {"type": "STRING"},
-                            "degree": {"type": "STRING"},
-                            "graduation_year": {"type": "STRING"}
-                        }
-                    }
-                }
-            }
-        }
-
         # 3. Optimized Prompt
         # We ask it to use visual layout cues (columns, bold text) to parse correctly.
         prompt = f"""
@@ -85,7 +97,6 @@ class ResumeParser:
 
         # 4. Multimodal Call
         # 4. Multimodal Call
-        from fastapi.concurrency import run_in_threadpool
         
         response = await run_in_threadpool(
             self.client.models.generate_content,
@@ -96,7 +107,7 @@ class ResumeParser:
             ],
             config={
                 'response_mime_type': 'application/json',
-                'response_schema': manual_schema,
+                'response_schema': RESUME_SCHEMA,
             }
         )
         return response.text
@@ -105,7 +116,6 @@ class ResumeParser:
         """
         Maps the flat JSON from Gemini to the nested profile schema used by the frontend/DB.
         """
-        from datetime import datetime
         
         def parse_date_string(date_str):
             if not date_str: return {"month": "", "year": ""}
@@ -178,13 +188,18 @@ class ResumeParser:
         with open(pdf_path, "rb") as f:
             pdf_bytes = f.read()
 
+        return await self.summarize_bytes(pdf_bytes)
+
+    async def summarize_bytes(self, pdf_bytes: bytes):
+        """generate_summary for resume content already in memory."""
         prompt = """
         Analyze this resume and write a concise, professional summary (max 3 sentences) suitable for a LinkedIn profile or resume header.
         Focus on key skills, years of experience, and primary achievements.
         Do not use specific names like "I am a..." just start with the role/adjective like "Experienced Software Engineer...".
         """
 
-        response = self.client.models.generate_content(
+        response = await run_in_threadpool(
+            self.client.models.generate_content,
             model="gemini-2.5-flash",
             contents=[
                 types.Part.from_bytes(data=pdf_bytes, mime_type="application/pdf"),
@@ -2,7 +2,12 @@ from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
+from contextlib import asynccontextmanager
 import os
+import logging
+
+# LOG_LEVEL=WARNING silences per-call info logs (e.g. Supabase writes) under load
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
 
 # Import routers
 from app.api.uploads import router as uploads_router
@@ -12,8 +17,24 @@ from app.api.agents import router as agents_router
 from app.api.leads import router as leads_router
 from app.api.chat import router as chat_router
 from app.api.worker import router as worker_router
+from app.services.browser_resolver import resolver
+from app.services.io_pool import io_pool, default_pool, install_default_executor
+from app.services import agent_runner
+from app.services.log_stream import log_stream_manager
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: bound the threads behind asyncio.to_thread()
+    install_default_executor()
+    yield
+    # Shutdown: release pooled connections and I/O threads
+    await resolver.aclose()
+    await agent_runner.aclose()
+    await log_stream_manager.aclose()
+    io_pool.shutdown(wait=False, cancel_futures=True)
+    default_pool.shutdown(wait=False, cancel_futures=True)
 
-app = FastAPI(title="Applied Agent UI", description="UI for Resume Management and Agent Control")
+app = FastAPI(title="Applied Agent UI", description="UI for Resume Management and Agent Control", lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -68,4 +89,5 @@ app.mount("/", StaticFiles(directory=static_dir, html=True), name="static")
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    # loop="auto" picks uvloop when it is installed
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True, loop="auto")
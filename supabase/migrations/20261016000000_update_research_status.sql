@@ -0,0 +1,57 @@
+-- Atomic research status transition for a single resume.
+-- Replaces the SELECT profile_data -> merge -> UPDATE round trip in
+-- app/services/agent_runner.py::update_research_status.
+-- A FINAL state (COMPLETED/FAILED/CANCELLED/CANCEL_REQUESTED) is never
+-- overwritten by an active one; only last_log/updated_at are refreshed.
+create or replace function public.update_research_status(
+    p_user_id bigint,
+    p_resume text,
+    p_status text,
+    p_last_log text default null
+)
+returns void
+language plpgsql
+as $$
+declare
+    final_states constant text[] := array['COMPLETED', 'FAILED', 'CANCELLED', 'CANCEL_REQUESTED'];
+    current_entry jsonb;
+    new_entry jsonb;
+begin
+    select coalesce(profile_data -> 'research_status' -> p_resume, '{}'::jsonb)
+      into current_entry
+      from profiles
+     where user_id = p_user_id
+       for update;
+
+    if not found then
+        return;
+    end if;
+
+    if coalesce(current_entry ->> 'status', 'IDLE') = any(final_states)
+       and not (p_status = any(final_states)) then
+        new_entry := current_entry || jsonb_build_object('updated_at', now()::text);
+        if p_last_log is not null then
+            new_entry := new_entry || jsonb_build_object('last_log', p_last_log);
+        end if;
+    else
+        new_entry := jsonb_build_object('status', p_status, 'updated_at', now()::text);
+        if p_last_log is not null then
+            new_entry := new_entry || jsonb_build_object('last_log', p_last_log);
+        end if;
+    end if;
+
+    update profiles
+       set profile_data = jsonb_set(
+               jsonb_set(
+                   coalesce(profile_data, '{}'::jsonb),
+                   '{research_status}',
+                   coalesce(profile_data -> 'research_status', '{}'::jsonb),
+                   true
+               ),
+               array['research_status', p_resume],
+               new_entry,
+               true
+           )
+     where user_id = p_user_id;
+end;
+$$;
@@ -0,0 +1,2 @@
+-- Serves get_pending_leads (user_id + status = 'NEW') and status filters in get_leads.
+create index if not exists leads_user_status_idx on leads (user_id, status);
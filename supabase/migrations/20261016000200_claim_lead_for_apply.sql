@@ -0,0 +1,19 @@
+-- Look up a user's lead by URL and set its status in one round trip.
+-- Returns the claimed row's id (empty result if no lead matches).
+create or replace function public.claim_lead_for_apply(
+    p_user_id bigint,
+    p_url text,
+    p_status text
+)
+returns table (id bigint)
+language sql
+as $$
+    update leads l
+       set status = p_status
+     where l.id = (
+            select m.id from leads m
+             where m.user_id = p_user_id and m.url = p_url
+             limit 1
+           )
+    returning l.id;
+$$;
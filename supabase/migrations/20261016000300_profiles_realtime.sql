@@ -0,0 +1,12 @@
+-- Publish profiles row changes to Supabase Realtime so a running research
+-- pipeline (app/services/cancel_watcher.py) sees CANCEL_REQUESTED without polling.
+do $$
+begin
+    if not exists (
+        select 1 from pg_publication_tables
+         where pubname = 'supabase_realtime' and schemaname = 'public' and tablename = 'profiles'
+    ) then
+        alter publication supabase_realtime add table public.profiles;
+    end if;
+end;
+$$;
@@ -0,0 +1,15 @@
+-- Return only the status string of one resume's research run, so cancellation
+-- checkpoints don't download and parse the whole profile_data document.
+create or replace function public.get_research_status(
+    p_user_id bigint,
+    p_resume text
+)
+returns text
+language sql
+stable
+as $$
+    select profile_data -> 'research_status' -> p_resume ->> 'status'
+      from profiles
+     where user_id = p_user_id
+     limit 1;
+$$;
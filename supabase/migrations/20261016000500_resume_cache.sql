@@ -0,0 +1,7 @@
+-- Parsed resume JSON keyed by the SHA-256 of the uploaded PDF, so repeat
+-- research runs on an unchanged resume skip the Gemini parse.
+create table if not exists public.resume_cache (
+    hash text primary key,
+    parsed text not null,
+    created_at timestamptz not null default now()
+);
@@ -0,0 +1,12 @@
+-- One row per (user, resume, url) so save_leads_bulk can insert with
+-- ON CONFLICT DO NOTHING instead of pre-fetching existing URLs.
+-- Drops older duplicates first (keeps the earliest row) so the index can be built.
+delete from public.leads a
+ using public.leads b
+ where a.user_id = b.user_id
+   and a.resume_filename = b.resume_filename
+   and a.url = b.url
+   and a.id > b.id;
+
+create unique index if not exists leads_user_resume_url
+    on public.leads (user_id, resume_filename, url);
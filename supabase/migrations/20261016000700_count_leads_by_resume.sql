@@ -0,0 +1,13 @@
+-- Lead counts per resume for one user, grouped in Postgres so the API receives
+-- one row per resume instead of one row per lead.
+-- Served by the (user_id, resume_filename, url) unique index.
+create or replace function public.count_leads_by_resume(p_user_id bigint)
+returns table (resume_filename text, cnt bigint)
+language sql
+stable
+as $$
+    select l.resume_filename, count(*)
+      from leads l
+     where l.user_id = p_user_id
+     group by l.resume_filename;
+$$;
@@ -0,0 +1,3 @@
+-- Lets create_user insert with ON CONFLICT (email) DO NOTHING, so registration
+-- detects an existing account in the same request as the insert.
+create unique index if not exists users_email_key on public.users (email);
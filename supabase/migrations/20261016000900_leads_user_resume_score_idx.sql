@@ -0,0 +1,4 @@
+-- Serves get_leads: filter on (user_id, resume_filename), ordered by match_score desc
+-- (unscored last) with id as tie-break, so both range pages and keyset cursors walk the index.
+create index if not exists leads_user_resume_score_idx
+    on leads (user_id, resume_filename, match_score desc nulls last, id desc);
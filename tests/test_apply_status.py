@@ -0,0 +1,25 @@
+import unittest
+from app.services.agent_runner import _final_lead_status
+
+class TestFinalLeadStatus(unittest.TestCase):
+    def test_dry_run_wins(self):
+        self.assertEqual(_final_lead_status("DryRun: form filled, Submitted skipped"), "DRY_RUN")
+        self.assertEqual(_final_lead_status("DryRun after error"), "DRY_RUN")
+
+    def test_applied(self):
+        self.assertEqual(_final_lead_status("Application Submitted"), "APPLIED")
+        self.assertEqual(_final_lead_status("Success"), "APPLIED")
+        self.assertEqual(_final_lead_status("APPLIED"), "APPLIED")
+
+    def test_failure_markers_override_success(self):
+        self.assertEqual(_final_lead_status("Submitted but an error occurred"), "FAILED")
+        self.assertEqual(_final_lead_status("Application could not be fully completed"), "FAILED")
+
+    def test_unclear_results_fail(self):
+        self.assertEqual(_final_lead_status("applied"), "FAILED")
+        self.assertEqual(_final_lead_status("The agent APPLIED filters"), "FAILED")
+        self.assertEqual(_final_lead_status(None), "FAILED")
+        self.assertEqual(_final_lead_status({"status": "done"}), "FAILED")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.services.browser_resolver import UrlResolver, _scan_apply_html, _is_ats_url
+
+# Asset and "similar jobs" ATS links come before the real apply button
+JOB_PAGE = """
+<html><head>
+  <link rel="stylesheet" href="https://boards.cdn.greenhouse.io/assets/board.css">
+  <script src="https://jobs.lever.co/static/embed.js"></script>
+  <img src="https://px.tracker.com/p.gif?src=greenhouse.io">
+</head><body>
+  <h1>Backend Engineer</h1>
+  <div class="similar"><a href="https://boards.greenhouse.io/other/jobs/111">Data Engineer at Other</a></div>
+  <div class="cta"><a href="https://boards.greenhouse.io/acme/jobs/222">Apply Now</a></div>
+</body></html>
+"""
+
+class TestApplyLinkScan(unittest.TestCase):
+    def test_picks_apply_link_not_assets_or_similar_jobs(self):
+        ats_url, apply_html = _scan_apply_html(JOB_PAGE, fallback_chars=1000)
+        self.assertEqual(ats_url, "https://boards.greenhouse.io/acme/jobs/222")
+        self.assertNotIn("board.css", apply_html)
+        self.assertNotIn("jobs/111", apply_html)
+
+    def test_no_ats_apply_link(self):
+        html = '<a href="https://www.adzuna.com/land/ad/1?redirect=1">Apply</a>'
+        ats_url, apply_html = _scan_apply_html(html, fallback_chars=1000)
+        self.assertIsNone(ats_url)
+        self.assertIn("adzuna.com", apply_html)
+
+    def test_redirect_links_kept_for_llm(self):
+        html = '<p>Access Denied</p><a href="/authenticate?to=job">here</a>'
+        ats_url, apply_html = _scan_apply_html(html, fallback_chars=1000)
+        self.assertIsNone(ats_url)
+        self.assertIn("/authenticate?to=job", apply_html)
+
+    def test_is_ats_url(self):
+        self.assertTrue(_is_ats_url("https://boards.greenhouse.io/acme/jobs/1"))
+        self.assertTrue(_is_ats_url("https://jobs.lever.co/acme/123/apply"))
+        self.assertFalse(_is_ats_url("https://boards.greenhouse.io/embed.js"))
+        self.assertFalse(_is_ats_url("https://px.tracker.com/p?src=greenhouse.io"))
+        self.assertFalse(_is_ats_url("/relative/apply"))
+
+class TestResolveApplicationUrl(unittest.IsolatedAsyncioTestCase):
+    async def test_cheap_path_skips_llm(self):
+        resolver = UrlResolver(api_key="test")
+        resolver._client = MagicMock()
+        response = MagicMock(text=JOB_PAGE, url="https://www.adzuna.com/details/1")
+        with patch("app.services.browser_resolver._http.get", AsyncMock(return_value=response)):
+            url = await resolver.resolve_application_url("https://www.adzuna.com/details/1")
+        self.assertEqual(url, "https://boards.greenhouse.io/acme/jobs/222")
+        resolver._client.models.generate_content.assert_not_called()
+
+class TestResolveJobUrlSingleflight(unittest.IsolatedAsyncioTestCase):
+    async def test_cancelled_first_caller_does_not_cancel_others(self):
+        resolver = UrlResolver(api_key="test")
+        release = asyncio.Event()
+
+        async def slow_resolve(url):
+            await release.wait()
+            return "https://boards.greenhouse.io/acme/jobs/222"
+
+        with patch.object(resolver, "resolve_application_url", AsyncMock(side_effect=slow_resolve)) as mock_resolve:
+            first = asyncio.create_task(resolver.resolve_job_url("https://www.adzuna.com/details/1"))
+            second = asyncio.create_task(resolver.resolve_job_url("https://www.adzuna.com/details/1"))
+            await asyncio.sleep(0)
+
+            first.cancel()
+            await asyncio.sleep(0)
+            release.set()
+
+            self.assertEqual(await second, "https://boards.greenhouse.io/acme/jobs/222")
+            with self.assertRaises(asyncio.CancelledError):
+                await first
+            self.assertEqual(mock_resolve.await_count, 1)
+            self.assertEqual(resolver._inflight, {})
+            # Cached for later callers
+            self.assertEqual(await resolver.resolve_job_url("https://www.adzuna.com/details/1"), "https://boards.greenhouse.io/acme/jobs/222")
+            self.assertEqual(mock_resolve.await_count, 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+from realtime import RealtimeSubscribeStates
+from app.services import cancel_watcher
+from app.services.cancel_watcher import CancellationWatcher
+
+class FakeRealtimeClient:
+    """Channels join instantly unless `connect` is set, which subscribe() then waits on (a slow socket)."""
+    instances = []
+
+    def __init__(self, url, key, auto_reconnect=False):
+        self.channels = {}
+        self.connect = None
+        self.close = AsyncMock()
+        FakeRealtimeClient.instances.append(self)
+
+    def channel(self, topic):
+        topic = f"realtime:{topic}"
+        channel = MagicMock(topic=topic, unsubscribe=AsyncMock())
+        async def subscribe(callback):
+            if self.connect is not None:
+                await self.connect.wait()
+            callback(RealtimeSubscribeStates.SUBSCRIBED, None)
+        channel.subscribe = subscribe
+        self.channels[topic] = channel
+        return channel
+
+class TestCancellationWatcher(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        FakeRealtimeClient.instances = []
+        cancel_watcher._client = None
+        for target, value in [("AsyncRealtimeClient", FakeRealtimeClient), ("SUPABASE_URL", "http://test"), ("SUPABASE_KEY", "key")]:
+            patcher = patch(f"app.services.cancel_watcher.{target}", value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.poll = AsyncMock(return_value=False)
+
+    async def asyncTearDown(self):
+        await cancel_watcher.aclose()
+
+    async def test_start_does_not_wait_for_slow_socket(self):
+        client = cancel_watcher._realtime_client()
+        client.connect = asyncio.Event()
+        watcher = CancellationWatcher(1, "r.pdf", self.poll)
+
+        with patch("app.services.cancel_watcher.CANCEL_SUBSCRIBE_TIMEOUT", 0.05):
+            await asyncio.wait_for(watcher.start(), 0.01)
+            # Not live yet: checkpoints poll
+            self.assertFalse(await watcher.is_cancelled())
+            self.assertEqual(self.poll.await_count, 1)
+            await watcher._join_task
+
+        # The connect timed out: channel dropped from the shared socket, polling continues
+        self.assertFalse(watcher._live)
+        self.assertEqual(client.channels, {})
+        self.poll.return_value = True
+        self.assertTrue(await watcher.is_cancelled())
+
+    async def test_watchers_share_one_socket(self):
+        first = CancellationWatcher(1, "r.pdf", self.poll)
+        second = CancellationWatcher(1, "r.pdf", self.poll)
+        await first.start()
+        await second.start()
+        await asyncio.gather(first._join_task, second._join_task)
+
+        self.assertEqual(len(FakeRealtimeClient.instances), 1)
+        client = FakeRealtimeClient.instances[0]
+        self.assertTrue(first._live and second._live)
+        self.assertEqual(len(client.channels), 2)
+
+        second._on_change({"data": {"record": {"profile_data": {"research_status": {"r.pdf": {"status": "CANCEL_REQUESTED"}}}}}})
+        self.assertTrue(await second.is_cancelled())
+
+        # Stopping one leaves its channel but keeps the socket for the other
+        await second.stop()
+        self.assertEqual(len(client.channels), 1)
+        client.close.assert_not_awaited()
+        await first.stop()
+        self.assertEqual(client.channels, {})
+
+    async def test_stop_cancels_pending_join(self):
+        client = cancel_watcher._realtime_client()
+        client.connect = asyncio.Event()
+        watcher = CancellationWatcher(1, "r.pdf", self.poll)
+        await watcher.start()
+        await asyncio.sleep(0)
+
+        await watcher.stop()
+        self.assertTrue(watcher._join_task.cancelled())
+        self.assertEqual(client.channels, {})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import queue
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+from app.services.supabase_client import SupabaseService
+
+class TestChatWriter(unittest.TestCase):
+    def setUp(self):
+        self.service = SupabaseService()
+        self.service.client = MagicMock()
+        self.table = self.service.client.table.return_value
+
+    def test_messages_batched_in_order(self):
+        for i in range(5):
+            self.service.save_chat_message(1, "user", str(i))
+        self.assertTrue(self.service.flush_chat_messages(1))
+
+        written = [m["content"] for call in self.table.insert.call_args_list for m in call.args[0]]
+        self.assertEqual(written, ["0", "1", "2", "3", "4"])
+
+    def test_flush_waits_only_for_own_session(self):
+        release = threading.Event()
+        self.table.insert.return_value.execute.side_effect = lambda: release.wait(5)
+
+        # Session 1's insert is stuck in flight; session 2 has nothing queued
+        self.service.save_chat_message(1, "user", "slow")
+        self.assertTrue(self.service.flush_chat_messages(2, timeout=0))
+        self.assertFalse(self.service.flush_chat_messages(1, timeout=0.05))
+
+        release.set()
+        self.assertTrue(self.service.flush_chat_messages(1, timeout=5))
+
+    def test_failed_batch_retried_per_session(self):
+        holding, release = threading.Event(), threading.Event()
+        def insert(rows, **kwargs):
+            if rows[0]["content"] == "hold":
+                holding.set()
+                release.wait(5)
+            if any(r["session_id"] == 2 for r in rows):
+                return MagicMock(execute=MagicMock(side_effect=Exception("FK violation")))
+            return MagicMock()
+        self.table.insert.side_effect = insert
+
+        # Hold the writer so the next three messages go out as one batch
+        self.service.save_chat_message(1, "user", "hold")
+        self.assertTrue(holding.wait(5))
+        self.service.save_chat_message(1, "user", "a")
+        self.service.save_chat_message(2, "user", "gone")
+        self.service.save_chat_message(1, "model", "b")
+        release.set()
+        self.assertTrue(self.service.flush_chat_messages(timeout=5))
+
+        batches = [[m["content"] for m in call.args[0]] for call in self.table.insert.call_args_list]
+        self.assertEqual(batches, [["hold"], ["a", "gone", "b"], ["a", "b"], ["gone"]])
+
+    def test_full_queue_waits_instead_of_jumping_ahead(self):
+        release = threading.Event()
+        self.table.insert.return_value.execute.side_effect = lambda: release.wait(5)
+        self.service.save_chat_message(1, "user", "0")
+        self.assertFalse(self.service.flush_chat_messages(timeout=0))
+
+        with patch("app.services.supabase_client.CHAT_ENQUEUE_TIMEOUT", 5):
+            self.service._chat_queue.maxsize = 1
+            self.service.save_chat_message(1, "user", "1")
+            saver = threading.Thread(target=self.service.save_chat_message, args=(1, "user", "2"))
+            saver.start()
+            release.set()
+            saver.join(5)
+        self.assertTrue(self.service.flush_chat_messages(1))
+
+        written = [m["content"] for call in self.table.insert.call_args_list for m in call.args[0]]
+        self.assertEqual(written, ["0", "1", "2"])
+
+    def test_delete_session_drops_its_queued_messages(self):
+        release = threading.Event()
+        self.table.insert.return_value.execute.side_effect = lambda: release.wait(5)
+        self.service.save_chat_message(1, "user", "in flight")
+        self.service.save_chat_message(2, "user", "queued")
+        self.service.save_chat_message(1, "user", "keep")
+
+        self.service._drop_queued_chat_messages(2)
+        self.assertNotIn(2, self.service._chat_pending)
+        release.set()
+        self.assertTrue(self.service.delete_chat_session(2))
+        self.assertTrue(self.service.flush_chat_messages(timeout=5))
+
+        written = [m["content"] for call in self.table.insert.call_args_list for m in call.args[0]]
+        self.assertEqual(written, ["in flight", "keep"])
+
+    def test_history_ordered_by_created_at_then_id(self):
+        self.service.get_chat_history(1)
+        order = self.table.select.return_value.eq.return_value.order
+        order.assert_called_once_with("created_at", desc=False)
+        order.return_value.order.assert_called_once_with("id", desc=False)
+
+if __name__ == "__main__":
+    unittest.main()
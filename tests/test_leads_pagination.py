@@ -0,0 +1,117 @@
+import asyncio
+import unittest
+import httpx
+import orjson
+from unittest.mock import MagicMock, patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from postgrest import SyncPostgrestClient
+from app.services.supabase_client import SupabaseService
+from app.api import leads as leads_api
+from app.api.auth import get_current_user
+
+def make_rows(*pairs):
+    return [{"id": id_, "title": f"Job {id_}", "match_score": score} for score, id_ in pairs]
+
+class FakePostgrest(unittest.TestCase):
+    """Runs the real postgrest query builder against a mock transport so tests see the exact request."""
+    def setUp(self):
+        self.requests = []
+        self.rows = []
+
+        def handler(request):
+            self.requests.append(request)
+            return httpx.Response(200, json=self.rows, headers={"Content-Range": f"0-{len(self.rows) - 1}/42"})
+
+        self.pg = SyncPostgrestClient("http://test/rest/v1", http_client=httpx.Client(transport=httpx.MockTransport(handler)))
+        self.service = SupabaseService()
+        self.service.client = MagicMock()
+        self.service.client.table.side_effect = self.pg.from_
+
+class TestLeadsKeysetCursor(FakePostgrest):
+    def test_page_mode_orders_and_counts(self):
+        self.rows = make_rows((90, 3), (None, 2))
+        result = self.service.get_leads(1, "r.pdf", page=2, limit=2)
+
+        request = self.requests[0]
+        self.assertEqual(request.url.params["order"], "match_score.desc.nullslast,id.desc")
+        self.assertEqual(request.url.params["offset"], "2")
+        self.assertIn("count=exact", request.headers["prefer"])
+        self.assertEqual(result["total"], 42)
+        self.assertEqual(result["next_after"], (None, 2))
+
+    def test_numeric_cursor_includes_ties_and_unscored(self):
+        self.service.get_leads(1, "r.pdf", limit=2, after=(85, 7))
+
+        params = self.requests[0].url.params
+        self.assertEqual(params["or"], "(match_score.lt.85,and(match_score.eq.85,id.lt.7),match_score.is.null)")
+        self.assertEqual(params["limit"], "2")
+        self.assertNotIn("count=", self.requests[0].headers.get("prefer", ""))
+
+    def test_integral_float_cursor_sent_as_integer(self):
+        self.service.get_leads(1, "r.pdf", limit=2, after=(85.0, 7))
+
+        self.assertEqual(self.requests[0].url.params["or"], "(match_score.lt.85,and(match_score.eq.85,id.lt.7),match_score.is.null)")
+
+    def test_null_cursor_stays_among_unscored(self):
+        self.rows = make_rows((None, 4))
+        result = self.service.get_leads(1, "r.pdf", limit=2, after=(None, 7))
+
+        params = self.requests[0].url.params
+        self.assertEqual(params["match_score"], "is.null")
+        self.assertEqual(params["id"], "lt.7")
+        self.assertNotIn("or", params)
+        self.assertIsNone(result["total"])
+        # Short page: nothing follows
+        self.assertIsNone(result["next_after"])
+
+class TestLeadsResponse(FakePostgrest):
+    async def call_endpoint(self, **kwargs):
+        args = dict(resume="r.pdf", page=1, limit=2, after_score=None, after_id=None, current_user={"id": 1, "email": "a@b.c"})
+        args.update(kwargs)
+        with patch.object(leads_api, "supabase_service", self.service):
+            return await leads_api.get_leads(**args)
+
+    def test_cached_json_spliced_into_response(self):
+        self.rows = make_rows((92, 3), (85, 1))
+
+        with patch("app.services.supabase_client.orjson.dumps", wraps=orjson.dumps) as dumps:
+            first = asyncio.run(self.call_endpoint())
+            second = asyncio.run(self.call_endpoint())
+
+        expected = {
+            "leads": self.rows, "total": 42, "next_after": [85, 1],
+            "page": 1, "limit": 2, "resume_context": "r.pdf"
+        }
+        self.assertEqual(orjson.loads(first.body), expected)
+        self.assertEqual(first.body, second.body)
+        # One query and one encode of the leads list; the second request is served from cache
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual([c.args[0] for c in dumps.call_args_list].count(self.rows), 1)
+
+    def test_cursor_params_forwarded(self):
+        response = asyncio.run(self.call_endpoint(after_id=7))
+
+        self.assertEqual(self.requests[0].url.params["match_score"], "is.null")
+        self.assertEqual(orjson.loads(response.body)["leads"], [])
+
+    def test_integer_score_cursor_forwarded(self):
+        asyncio.run(self.call_endpoint(after_score=85, after_id=7))
+
+        self.assertEqual(self.requests[0].url.params["or"], "(match_score.lt.85,and(match_score.eq.85,id.lt.7),match_score.is.null)")
+
+    def test_next_after_round_trips_over_http(self):
+        app = FastAPI()
+        app.include_router(leads_api.router, prefix="/leads")
+        app.dependency_overrides[get_current_user] = lambda: {"id": 1, "email": "a@b.c"}
+        self.rows = make_rows((92, 3), (85, 1))
+
+        with patch.object(leads_api, "supabase_service", self.service):
+            client = TestClient(app)
+            score, id_ = client.get("/leads/", params={"resume": "r.pdf", "limit": 2}).json()["next_after"]
+            client.get("/leads/", params={"resume": "r.pdf", "limit": 2, "after_score": score, "after_id": id_})
+
+        self.assertEqual(self.requests[1].url.params["or"], "(match_score.lt.85,and(match_score.eq.85,id.lt.1),match_score.is.null)")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+from realtime import RealtimeSubscribeStates
+from app.services.log_stream import LogStreamManager, SUBSCRIBER_QUEUE_MAX, _CLOSE
+
+class TestLogStreamFlush(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.manager = LogStreamManager()
+        self.manager._realtime_enabled = False
+
+    async def test_burst_coalesced_into_one_chunk_per_subscriber(self):
+        a, b = asyncio.Queue(), asyncio.Queue()
+        self.manager._subscriptions["1"] = {a, b}
+
+        for i in range(3):
+            await self.manager.broadcast("1", f"line {i}")
+        self.assertTrue(a.empty())
+
+        self.manager._flush()
+        expected = b"".join(f"event: log\ndata: line {i}\n\n".encode() for i in range(3))
+        for q in (a, b):
+            self.assertEqual(q.qsize(), 1)
+            self.assertEqual(q.get_nowait(), expected)
+        self.assertEqual(self.manager._pending, {})
+
+    async def test_scheduled_flush_delivers(self):
+        q = asyncio.Queue()
+        self.manager._subscriptions["1"] = {q}
+        with patch("app.services.log_stream.SSE_FLUSH_INTERVAL", 0):
+            await self.manager.broadcast("1", "hello", type="status")
+            chunk = await asyncio.wait_for(q.get(), 1)
+        self.assertEqual(chunk, b"event: status\ndata: hello\n\n")
+        self.assertIsNone(self.manager._flush_handle)
+
+    async def test_full_subscriber_closed_others_still_served(self):
+        slow, fast = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_MAX), asyncio.Queue()
+        for _ in range(SUBSCRIBER_QUEUE_MAX):
+            slow.put_nowait(b"old")
+        self.manager._subscriptions["1"] = {slow, fast}
+
+        await self.manager.broadcast("1", "new")
+        self.manager._flush()
+
+        self.assertEqual(fast.get_nowait(), b"event: log\ndata: new\n\n")
+        self.assertIs(slow.get_nowait(), _CLOSE)
+        self.assertTrue(slow.empty())
+        self.assertEqual(self.manager._subscriptions["1"], {fast})
+
+class FakeRealtimeClient:
+    """Channels join instantly, except topics listed in `failing`, which are rejected."""
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.channels = {}
+
+    def channel(self, topic):
+        topic = f"realtime:{topic}"
+        channel = MagicMock(topic=topic, send_broadcast=AsyncMock(), unsubscribe=AsyncMock())
+        async def subscribe(callback):
+            rejected = topic in self.failing
+            callback(RealtimeSubscribeStates.CHANNEL_ERROR if rejected else RealtimeSubscribeStates.SUBSCRIBED, None)
+        channel.subscribe = subscribe
+        self.channels[topic] = channel
+        return channel
+
+class TestRealtimeBroadcast(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.manager = LogStreamManager()
+        self.manager._realtime_enabled = True
+        self.client = self.manager._realtime_client = FakeRealtimeClient(failing={"realtime:session_1"})
+
+    async def test_failed_join_only_backs_off_that_session(self):
+        await self.manager._realtime_send("1", "a", "log")
+        await self.manager._realtime_send("2", "b", "log")
+
+        self.assertTrue(self.manager._realtime_enabled)
+        self.assertNotIn("1", self.manager._realtime_channels)
+        self.assertNotIn("realtime:session_1", self.client.channels)
+        channel = await self.manager._realtime_channels["2"]
+        channel.send_broadcast.assert_awaited_once_with("log", {"message": "b", "type": "log"})
+
+        # Within the backoff window session 1 doesn't retry the join
+        self.client.failing.clear()
+        await self.manager._realtime_send("1", "c", "log")
+        self.assertNotIn("realtime:session_1", self.client.channels)
+
+        # Once it passes, the join is retried
+        self.manager._realtime_retry_at["1"] = 0
+        await self.manager._realtime_send("1", "d", "log")
+        self.assertIn("1", self.manager._realtime_channels)
+        await self.manager.aclose()
+
+    async def test_channel_released_when_idle_or_on_terminal_event(self):
+        with patch("app.services.log_stream.REALTIME_CHANNEL_IDLE", 0.01):
+            await self.manager._realtime_send("2", "working", "log")
+            channel = await self.manager._realtime_channels["2"]
+            await asyncio.sleep(0.05)
+        channel.unsubscribe.assert_awaited_once()
+        self.assertEqual(self.manager._realtime_channels, {})
+        self.assertEqual(self.client.channels, {})
+
+        await self.manager._realtime_send("3", "done", "complete")
+        self.assertEqual(self.manager._realtime_channels, {})
+        self.assertEqual(self.manager._realtime_idle, {})
+
+if __name__ == "__main__":
+    unittest.main()
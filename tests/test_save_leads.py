@@ -0,0 +1,60 @@
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+from postgrest.exceptions import APIError
+from app.services.supabase_client import SupabaseService
+
+def make_leads(n):
+    return [{"title": f"Job {i}", "company": "Acme", "url": f"https://jobs.lever.co/acme/{i}"} for i in range(n)]
+
+class TestSaveLeadsBulk(unittest.TestCase):
+    def setUp(self):
+        self.service = SupabaseService()
+        self.service.client = MagicMock()
+        self.table = self.service.client.table.return_value
+
+    def test_chunks_written_concurrently_outside_io_pool(self):
+        # All three chunks must be in flight at once to get past the barrier
+        barrier = threading.Barrier(3, timeout=5)
+        threads = []
+        def execute():
+            threads.append(threading.current_thread().name)
+            barrier.wait()
+            return MagicMock(count=1)
+        self.table.upsert.return_value.execute.side_effect = execute
+
+        with patch("app.services.supabase_client.LEADS_INSERT_BATCH_SIZE", 2):
+            # Run from a single-thread io_pool stand-in: must not wait on work queued behind itself
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="io") as pool:
+                saved = pool.submit(self.service.save_leads_bulk, 1, "r.pdf", make_leads(5)).result(10)
+
+        # 3 chunks (2 + 2 + 1), one new row each
+        self.assertEqual(saved, 3)
+        self.assertEqual(self.table.upsert.call_count, 3)
+        self.assertTrue(all(name.startswith("leads-write") for name in threads))
+        self.assertEqual(self.table.upsert.call_args.kwargs["on_conflict"], "user_id,resume_filename,url")
+
+    def test_missing_unique_index_falls_back_to_dedup_insert(self):
+        self.table.upsert.return_value.execute.side_effect = APIError({"code": "42P10", "message": "no unique constraint"})
+        self.table.select.return_value.eq.return_value.eq.return_value.execute.return_value.data = [
+            {"url": "https://jobs.lever.co/acme/0"}
+        ]
+        self.table.insert.return_value.execute.return_value.count = 2
+
+        saved = self.service.save_leads_bulk(1, "r.pdf", make_leads(3))
+
+        self.assertEqual(saved, 2)
+        inserted = self.table.insert.call_args.args[0]
+        self.assertEqual([r["url"] for r in inserted], ["https://jobs.lever.co/acme/1", "https://jobs.lever.co/acme/2"])
+
+    def test_other_api_errors_are_not_swallowed_into_fallback(self):
+        self.table.upsert.return_value.execute.side_effect = APIError({"code": "42501", "message": "permission denied"})
+
+        saved = self.service.save_leads_bulk(1, "r.pdf", make_leads(1))
+
+        self.assertIsNone(saved)
+        self.table.insert.assert_not_called()
+
+if __name__ == "__main__":
+    unittest.main()